@@ -0,0 +1,34 @@
+"""Load json credentials, parsed content is cached and re-read only when
+   the modification time of the file changes, orjson is used when installed
+
+   __author__: Ugo Varetto
+"""
+import os
+from typing import Dict, Tuple
+try:
+    import orjson as _json  # loads accepts bytes, no decoding required
+    _MODE = "rb"
+except ImportError:
+    import json as _json
+    _MODE = "r"
+
+_cache: Dict[str, Tuple[Tuple[str, int], Dict]] = {}
+
+
+def load(path: str) -> Dict:
+    """Return parsed json credentials file
+
+    Args:
+        path (str): path to json file
+    Returns:
+        dict: parsed json content, shared among callers, do not modify
+    """
+    st = os.stat(path)
+    k = (path, st.st_mtime_ns)
+    hit = _cache.get(path)
+    if hit and hit[0] == k:
+        return hit[1]
+    with open(path, _MODE) as f:
+        data = _json.loads(f.read())
+    _cache[path] = (k, data)
+    return data
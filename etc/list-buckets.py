@@ -1,37 +1,54 @@
 #!/usr/bin/env python3
 import sys
-import boto3
 import json
+import s3session
+import creds
+from concurrent.futures import ThreadPoolExecutor
+
+# below the client connection pool size, see s3session
+_MAX_WORKERS = 20
 
 
 def print_dict(d):
-    for (k, v) in d.items():
-        print(f"{k}: {v}")
+    # single write of the whole dictionary or list of dictionaries,
+    # datetime fields returned by boto3 are printed as strings
+    sys.stdout.write(json.dumps(d, default=str, indent=2))
+    sys.stdout.write("\n")
+
+
+def list_bucket(s3_client, name):
+    # all pages, not only the first 1000 keys returned by list_objects_v2
+    paginator = s3_client.get_paginator('list_objects_v2')
+    pages = paginator.paginate(Bucket=name,
+                               PaginationConfig={'PageSize': 1000})
+    return [obj for page in pages for obj in page.get('Contents', [])]
 
 
 # 1) Read credential from file
 # 2) Create client connection
-# 3) Retrieve and print received response and bucket information
+# 3) Retrieve bucket list and list objects in all buckets concurrently
+# 4) Print received response and bucket information
 if __name__ == "__main__":
-    with open("s3-credentials-local.json", "r") as f:
-        credentials = json.loads(f.read())
+    credentials = creds.load("s3-credentials-local.json")
     endpoint = credentials['endpoint']
     access_key = credentials['access_key']
     secret_key = credentials['secret_key']
     try:
-        s3_client = boto3.client('s3',
-                                 endpoint_url=endpoint,
-                                 aws_access_key_id=access_key,
-                                 aws_secret_access_key=secret_key
-                                 )
+        s3_client = s3session.get_client(endpoint, access_key, secret_key)
         response = s3_client.list_buckets()
-        for b in response['Buckets']:
+        buckets = response['Buckets']
+        # boto3 clients are thread safe, the connection pool is shared
+        with ThreadPoolExecutor(
+                max_workers=max(1, min(len(buckets), _MAX_WORKERS))) \
+                as executor:
+            objects = list(executor.map(
+                lambda b: list_bucket(s3_client, b["Name"]), buckets))
+        for b, objs in zip(buckets, objects):
             print("="*10)
             print("RESPONSE")
             print_dict(b)
             print("-"*10)
             print("BUCKET")
-            objs = s3_client.list_objects_v2(Bucket=b["Name"])
             print_dict(objs)
             print("-"*10)
 
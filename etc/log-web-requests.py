@@ -1,93 +1,153 @@
 #!/usr/bin/env python3
 
 import sys
+import os
+import socket
 import logging
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import argparse
+import itertools
+import hashlib
+from aiohttp import web
 import typing as T
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 """Minimal logging http server, uses 'logging' module
 
    __author__: Ugo Varetto
 
-   Usage: ./log-web-requests.py <port>
+   Usage: ./log-web-requests.py <port> [--workers N] [--raw]
 
-   HTTPServer will be printing out a 'localhost - - [date] "Request" status -'
-   at each request in addition to the data logged by the RequestHandler class
-"""
+   Requests are served by an aiohttp application running on the asyncio
+   event loop, so slow clients sending large bodies do not block other
+   requests; aiohttp will be printing out a 'localhost [date] "Request"
+   status' line at each request in addition to the data logged by 'handle'
+
+   When installed, uvloop replaces the default asyncio event loop; with
+   '--workers N' N processes are forked, each one running its own event loop
+   on a SO_REUSEPORT socket bound to the same port, request numbering is
+   therefore per worker
 
+   With '--raw' the request line and the header block received from the
+   client are written as bytes to standard output instead of being decoded
+   and passed to the 'logging' module
+"""
 
-class RequestHandler(BaseHTTPRequestHandler):
-
-    # incremented at each request, cannot be an instance,
-    # cannot be an instance variable because a new instance
-    # is created at each http request received
-    count: int = 0
-    log_function: T.Callable = logging.info
-
-    def __print_request_info(request, client_address, server):
-        RequestHandler.log_function(f"{request}, {client_address}, {server}")
-
-    def __init__(self, request, client_address, server):
-        super(RequestHandler, self).__init__(request, client_address, server)
-        # RequestHandler.__print_request_info(request, client_address, server)
-
-    def _log(self, msg):
-        RequestHandler.log_function(msg)
-
-    def _print_text_header(self):
-        headers_text = ""
-        for (k, v) in self.headers.items():
-            headers_text += f'{k}: {v}\n'
-        return headers_text
-
-    def _print_reqline_and_headers(self):
-        RequestHandler.count += 1
-        return "\n" + "="*20 + \
-               f"Request #: {RequestHandler.count}\n" + \
-               "------REQUEST LINE:\n" + \
-               self.requestline + "\n\n" + \
-               "------HEADERS" + "\n" + \
-               self._print_text_header()
-
-    def _send_default_response(self, method=None):
-        # method not currently used
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-
-    def do_GET(self):
-        self._log(self._print_reqline_and_headers())
-        self._send_default_response("GET")
-
-    def do_HEAD(self):
-        self._log(self._print_reqline_and_headers())
-        self._send_default_response("HEAD")
-
-    def do_POST(self):
-        from array import array
-        a = array('b', self.rfile.read(int(self.headers['Content-Length'])))
-        log_msg = "------REQUEST_BODY" + "\n" + \
-                  f"{a.tostring()}"
-        self._log(self._print_reqline_and_headers() + "\n" + log_msg)
-        self._send_default_response("POST")
-
-    def do_PUT(self):
-        from array import array
-        a = array('b', self.rfile.read(int(self.headers['Content-Length'])))
-        log_msg = "------REQUEST_BODY" + "\n" + \
-                  f"{a.tostring()}"
-        self._log(self._print_reqline_and_headers() + "\n" + log_msg)
-        self._send_default_response("PUT")
+# incremented at each request, itertools.count is a C iterator and all
+# handlers run on the same event loop thread, no locking required
+_counter: T.Iterator[int] = itertools.count(1)
+logger: logging.Logger = logging.getLogger(__name__)
+_READ_CHUNK_SIZE: int = 1 << 16
+_LOG_BODY_PREFIX_LENGTH: int = 256
+_RAW: bool = False
+
+
+def _print_text_header(request: web.Request) -> str:
+    return "".join(f'{k}: {v}\n' for (k, v) in request.headers.items())
+
+
+def _request_line(request: web.Request) -> str:
+    return f"{request.method} {request.path_qs} " + \
+           f"HTTP/{request.version.major}.{request.version.minor}"
+
+
+def _print_reqline_and_headers(request: web.Request, count: int) -> str:
+    parts = ["\n", "="*20,
+             f"Request #: {count}\n",
+             "------REQUEST LINE:\n",
+             _request_line(request), "\n\n",
+             "------HEADERS\n",
+             _print_text_header(request)]
+    return "".join(parts)
+
+
+def _raw_reqline_and_headers(request: web.Request, count: int) -> bytes:
+    # raw_headers are the (name, value) byte strings as received
+    parts = [b"\n", b"="*20,
+             b"Request #: %d\n" % count,
+             b"------REQUEST LINE:\n",
+             _request_line(request).encode(), b"\n\n",
+             b"------HEADERS\n"]
+    parts.extend(b"%s: %s\n" % kv for kv in request.raw_headers)
+    return b"".join(parts)
+
+
+def _send_default_response(method: str = None) -> web.Response:
+    # method not currently used
+    return web.Response(text='', content_type='text/html')
+
+
+def _reuse_port_socket(port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('', port))
+    return sock
+
+
+async def _read_body(request: web.Request) -> str:
+    """Consume request body in chunks, only size, hash and first bytes
+       are kept instead of the whole body
+    """
+    size = 0
+    head = b""
+    h = hashlib.blake2b(digest_size=16)
+    async for chunk in request.content.iter_chunked(_READ_CHUNK_SIZE):
+        if len(head) < _LOG_BODY_PREFIX_LENGTH:
+            head += chunk[:_LOG_BODY_PREFIX_LENGTH - len(head)]
+        h.update(chunk)
+        size += len(chunk)
+    return f"size: {size}, blake2b: {h.hexdigest()}, {head}"
+
+
+async def handle(request: web.Request) -> web.Response:
+    count = next(_counter)
+    if _RAW:
+        sys.stdout.buffer.write(_raw_reqline_and_headers(request, count))
+    elif logger.isEnabledFor(logging.INFO):
+        msg = _print_reqline_and_headers(request, count)
+        # only POST and PUT bodies are logged, other methods e.g. HEAD
+        # never read the body; unread content is discarded by aiohttp
+        if request.method in ("POST", "PUT"):
+            body = await _read_body(request) if request.body_exists \
+                else None
+            msg += "\n" + "------REQUEST_BODY" + "\n" + f"{body}"
+        logger.info(msg)
+    return _send_default_response(request.method)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f'usage: {sys.argv[0]} <port>', file=sys.stderr)
-        sys.exit(-1)
-    port = int(sys.argv[1])
-    server_address = ('', port)
-    handler_class = RequestHandler
-    httpd = HTTPServer(server_address, handler_class)
-    print(f"Starting http server on port {port}...")
+    parser = argparse.ArgumentParser(
+        description='log received web requests through the logging module')
+    parser.add_argument('port', type=int, help='tcp port')
+    parser.add_argument('-w', '--workers', dest='workers', type=int,
+                        required=False, default=1,
+                        help='number of worker processes')
+    parser.add_argument('-r', '--raw', dest='raw', action='store_true',
+                        help='write request line and headers to stdout ' +
+                             'as received, bypassing the logging module')
+    args = parser.parse_args()
+    _RAW = args.raw
+    port = args.port
+    if uvloop:
+        uvloop.install()
+    print(f"Starting http server on port {port}" +
+          (f" with {args.workers} workers" if args.workers > 1 else "") +
+          "...")
+    sock = None
+    if args.workers > 1:
+        # fork before creating the event loop, each child binds its own
+        # socket and the kernel distributes connections among workers
+        for _ in range(args.workers - 1):
+            if os.fork() == 0:
+                break
+        sock = _reuse_port_socket(port)
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
     logging.basicConfig(level=logging.INFO)
-    httpd.serve_forever()
+    if sock:
+        web.run_app(app, sock=sock, print=None)
+    else:
+        web.run_app(app, port=port, print=None)
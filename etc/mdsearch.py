@@ -1,20 +1,67 @@
 #!/usr/bin/env python3
 import s3v4_rest as s3
-import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import creds
+try:
+    import httpx
+except ImportError:
+    httpx = None
 # mdsearch
+
+_MAX_CONNECTIONS = 32
+
+
+async def _send_async(requests_list):
+    limits = httpx.Limits(max_keepalive_connections=_MAX_CONNECTIONS)
+    try:
+        # responses multiplexed on a single connection
+        client = httpx.AsyncClient(http2=True, limits=limits)
+    except ImportError:  # 'h2' package not installed
+        client = httpx.AsyncClient(limits=limits)
+    async with client as c:
+        return await asyncio.gather(*(c.get(url, headers=h)
+                                      for url, h in requests_list))
+
+
+def send_requests(requests_list):
+    """Send GET requests concurrently, returns responses in the same order
+
+    Args:
+        requests_list (List[Tuple[URL, Headers]]): requests built with
+                                                   s3.build_request_url
+    Returns:
+        list: httpx.Response or requests.Response objects
+    """
+    if httpx:
+        return asyncio.run(_send_async(requests_list))
+    session = s3.s3_session(pool_maxsize=_MAX_CONNECTIONS)
+    with ThreadPoolExecutor(min(len(requests_list), _MAX_CONNECTIONS)) \
+            as executor:
+        return list(executor.map(
+            lambda req: session.get(req[0], headers=req[1]), requests_list))
+
+
+def print_response(request_url, headers, r):
+    # send request and print response
+    print('Request URL = ' + request_url)
+    print(headers)
+    print('\nResponse')
+    print(f"Response code: {r.status_code}\n")
+    print(r.text)
+
+
 if __name__ == "__main__":
     # read configuration information - OBJECT
-    with open("config/magenta-object.json", "r") as f:
-        credentials = json.loads(f.read())
+    credentials = creds.load("config/magenta-object.json")
     # payload, empty in this case
-    payload_hash = s3.hash('')
+    payload_hash = s3.EMPTY_SHA256
     bucket_name = "test2"
     # https://documentation.suse.com/ses/6/html/ses-all/cha-ceph-gw.html
-    # enable indexing
+    # retrieve indexing configuration
     search_header = {'x-amz-meta-search': "x-amz-meta-key1;string"}
     # build request
-    request_url, headers = s3.build_request_url(
+    mdsearch_request = s3.build_request_url(
         config=credentials,
         req_method='GET',
         parameters={'mdsearch': ''},
@@ -24,17 +71,9 @@ if __name__ == "__main__":
         additional_headers=search_header
     )
     # read configuration information - METADATA
-    with open("config/magenta-metadata.json", "r") as f:
-        credentials = json.loads(f.read())
-    # send request and print response
-    print('Request URL = ' + request_url)
-    print(headers)
-    r = requests.get(request_url, headers=headers)
-    print('\nResponse')
-    print(f"Response code: {r.status_code}\n")
-    print(r.text)
+    credentials = creds.load("config/magenta-metadata.json")
     # build request
-    request_url, headers = s3.build_request_url(
+    query_request = s3.build_request_url(
         config=credentials,
         req_method='GET',
         parameters={"query": "name==file-020"},
@@ -42,14 +81,12 @@ if __name__ == "__main__":
         payload_length=0,
         uri_path=f"/{bucket_name}"
     )
-    # send request and print response
-    print('Request URL = ' + request_url)
-    print(headers)
-    r = requests.get(request_url, headers=headers)
-    print('\nResponse')
-    print(f"Response code: {r.status_code}\n")
-    print(r.text)
+    # both requests are read only and independent: send them concurrently
+    requests_list = [mdsearch_request, query_request]
+    responses = send_requests(requests_list)
+    for (request_url, headers), r in zip(requests_list, responses):
+        print_response(request_url, headers, r)
     # parse and print XML response
     print("\n")
-    s3.print_xml(r.text)
-    print("\n")
\ No newline at end of file
+    print(s3.xml_to_text(r.content))
+    print("\n")
@@ -1,14 +1,14 @@
 #!/usr/bin/env python3
 import sys
-import boto3
-import json
+import s3session
+import creds
 import random
 import string
 
 
 def print_dict(d):
-    for (k, v) in d.items():
-        print(f"{k}: {v}")
+    # single write instead of one print call per key
+    sys.stdout.write("".join(f"{k}: {v}\n" for (k, v) in d.items()))
 
 
 def random_text(length=20):
@@ -22,31 +22,30 @@ def random_text(length=20):
 # 5) Print updated metadata
 if __name__ == "__main__":
     
-    with open("s3-credentials.json", "r") as f:
-        credentials = json.loads(f.read())
+    credentials = creds.load("s3-credentials.json")
     endpoint = credentials['endpoint']
     access_key = credentials['access_key']
     secret_key = credentials['secret_key']
     try:
-        s3 = boto3.resource('s3',
-                        endpoint_url=endpoint,
-                        aws_access_key_id=access_key,
-                        aws_secret_access_key=secret_key
-                        )
+        s3 = s3session.get_resource(endpoint, access_key, secret_key)
         bucket_name = "uv-bucket-1"
         key_name = "ceph-file1"
         obj = s3.Object(bucket_name, key_name)
         metadata = random_text()
         if len(sys.argv) > 1:
-            metadata = argv[1]
+            metadata = sys.argv[1]
+        # single HEAD request, updated metadata is printed from local copy
+        # instead of reloading the object after the copy
+        obj.load()
+        md = dict(obj.metadata)
         print("Old metadata")
-        print_dict(obj.metadata)
+        print_dict(md)
         print("updating metadata...")
-        obj.metadata.update({"comment": metadata})
-        obj.copy_from(CopySource={'Bucket': 'uv-bucket-1', 'Key': 'ceph-file1'},
-                    Metadata=obj.metadata, MetadataDirective='REPLACE')
+        md.update({"comment": metadata})
+        obj.copy_from(CopySource={'Bucket': bucket_name, 'Key': key_name},
+                      Metadata=md, MetadataDirective='REPLACE')
         print("New metadata")
-        print_dict(obj.metadata)
+        print_dict(md)
 
     except Exception as e:
         print(f"{e}", file=sys.stderr)
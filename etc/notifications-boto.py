@@ -2,8 +2,10 @@
 
 import argparse
 import sys
-import boto3
-import json
+import functools
+import s3session
+import creds
+from typing import Dict, Tuple, NamedTuple
 
 
 nc = {
@@ -19,28 +21,71 @@ nc = {
 }
 
 
-def main(bucket):
-    data = {}
-    # if topics:
-    #     data['TopicConfigurations'] = [
-    #         {
-    #             'TopicArn': topic,
-    #             'Events': events
-    #         }
-    #         for topic in topics if topic
-    #     ]
-
-    with open("config/s3-credentials.json", "r") as f:
-        credentials = json.loads(f.read())
+@functools.lru_cache(maxsize=None)
+def _client():
+    # credentials and client are created once, not at each 'main' call
+    credentials = creds.load("config/s3-credentials.json")
     endpoint = credentials['endpoint']
     access_key = credentials['access_key']
     secret_key = credentials['secret_key']
-    bucket = "uv-bucket-3"
+    return s3session.get_client(endpoint, access_key, secret_key)
+
+
+class TopicConfiguration(NamedTuple):
+    TopicArn: str
+    Events: Tuple[str]
+
+
+class QueueConfiguration(NamedTuple):
+    QueueArn: str
+    Events: Tuple[str]
+
+
+class LambdaFunctionConfiguration(NamedTuple):
+    LambdaFunctionArn: str
+    Events: Tuple[str]
+
+
+@functools.lru_cache(maxsize=None)
+def _configuration(cls, arn: str, events: Tuple[str]):
+    # one immutable instance per unique (type, ARN, events)
+    return cls(arn, events)
+
+
+def _to_builtins(cfg: NamedTuple) -> Dict:
+    # boto3 expects dictionaries and lists
+    return {k: list(v) if isinstance(v, tuple) else v
+            for k, v in cfg._asdict().items()}
+
+
+@functools.lru_cache(maxsize=None)
+def notification_configuration(topics: Tuple[str] = (),
+                               queues: Tuple[str] = (),
+                               lambdas: Tuple[str] = (),
+                               events: Tuple[str] = ()) -> Dict:
+    """Build notification configuration once per unique set of ARNs and
+       events; returned dictionary is shared, do not modify
+    """
+    data = {}
+    for key, cls, arns in (('TopicConfigurations',
+                            TopicConfiguration, topics),
+                           ('QueueConfigurations',
+                            QueueConfiguration, queues),
+                           ('LambdaFunctionConfigurations',
+                            LambdaFunctionConfiguration, lambdas)):
+        if arns:
+            data[key] = [_to_builtins(_configuration(cls, arn, events))
+                         for arn in arns if arn]
+    return data
+
+
+def main(bucket, topics=(), queues=(), lambdas=(), events=()):
+    data = notification_configuration(tuple(topics or ()),
+                                      tuple(queues or ()),
+                                      tuple(lambdas or ()),
+                                      tuple(events or ()))
     try:
-        s3_client = boto3.client('s3',
-                                 endpoint_url=endpoint,
-                                 aws_access_key_id=access_key,
-                                 aws_secret_access_key=secret_key)
+        s3_client = _client()
 
         response = s3_client.put_bucket_notification_configuration(
             Bucket=bucket,
@@ -49,7 +94,7 @@ def main(bucket):
 
         if data:
             print(data)
-            s3 = boto3.resource('s3')
+            s3 = s3session.get_resource()
             bucket_notification = s3.BucketNotification(bucket)
             response = bucket_notification.put(NotificationConfiguration=data)
             print('Bucket notification updated successfully')
@@ -61,4 +106,4 @@ def main(bucket):
 
 
 if __name__ == '__main__':
-    main("uv-bucket-3")
\ No newline at end of file
+    main("uv-bucket-3")
@@ -1,27 +1,52 @@
 #!/usr/bin/env python3
 import sys
-import boto3
-import json
+import s3session
+import creds
+from concurrent.futures import ThreadPoolExecutor
+
+_CHUNK_SIZE = 1 << 16
 
 
 def print_dict(d):
-    for (k, v) in d.items():
-        print(f"{k}: {v}")
+    # single write instead of one print call per key
+    sys.stdout.write("".join(f"{k}: {v}\n" for (k, v) in d.items()))
+
+
+def read_body(response):
+    return b"".join(response["Body"].iter_chunks(_CHUNK_SIZE))
+
+
+def get_range(s3_client, bucket, key, start, end):
+    """Return bytes in [start, end] range, end included"""
+    response = s3_client.get_object(Bucket=bucket, Key=key,
+                                    Range=f"bytes={start}-{end}")
+    return read_body(response)
+
+
+def get_range_parallel(s3_client, bucket, key, start, end, parts=8):
+    """Split [start, end] range into 'parts' sub-ranges retrieved through
+       concurrent requests, the client connection pool is shared among
+       threads
+    """
+    size = end - start + 1
+    step = max(1, -(-size // parts))
+    ranges = [(b, min(b + step, end + 1) - 1)
+              for b in range(start, end + 1, step)]
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        chunks = executor.map(
+            lambda r: get_range(s3_client, bucket, key, *r), ranges)
+        return b"".join(chunks)
 
 #1) Connect
 #2) Retrieve object reference
 #3) Extract data
 if __name__ == "__main__":
-    with open("config/s3-credentials.json", "r") as f:
-        credentials = json.loads(f.read())
+    credentials = creds.load("config/s3-credentials.json")
     endpoint = credentials['endpoint']
     access_key = credentials['access_key']
     secret_key = credentials['secret_key']
     try:
-        s3_client = boto3.client('s3',
-                                 endpoint_url=endpoint,
-                                 aws_access_key_id=access_key,
-                                 aws_secret_access_key=secret_key)
+        s3_client = s3session.get_client(endpoint, access_key, secret_key)
         bucket_name = "uv-bucket-3"
         key_name = "key-multipart-test10"
         byte_range = "bytes=10-100"
@@ -34,7 +59,7 @@ if __name__ == "__main__":
         print_dict(response)
         print("-"*10)
         print(f"{byte_range}\n")
-        bytes = response["Body"].read()
+        bytes = read_body(response)
         print(bytes)
         print("="*10)
     except Exception as e:
@@ -1,39 +1,71 @@
 import json
-from typing import Dict, List, Union
+from email.message import Message
+from typing import Dict, List, Union, Tuple, Iterator
+try:
+    import orjson  # faster, dumps returns bytes, no encoding required
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(o) -> bytes:
+        return json.dumps(o).encode('utf-8')
+
+
+def _iter_paths(key: str, d: Union[Dict, List], path: Tuple = ()) \
+        -> Iterator[Tuple[Tuple, Union[Dict, List]]]:
+    """Yields paths to a specific key in a dictionary representing a json
+       tree, in depth-first order, together with the node containing the
+       dictionary where the key was found.
+
+    Iterative, paths are stored as tuples and extended only when a child is
+    pushed on the stack.
+
+    Args:
+        key (str): key to search for
+        d (dict):  dictionary representing a json tree
+        path (tuple): path to 'd'
+    Returns:
+        iterator: (path, parent) tuples, parent is None when the key is
+                  found in 'd'
+    """
+    if not isinstance(d, (dict, list)):
+        return
+    stack = [(d, path, None)]
+    while stack:
+        node, p, parent = stack.pop()
+        if isinstance(node, list):
+            children = [(x, p + (i,), node) for i, x in enumerate(node)
+                        if isinstance(x, dict)]
+        else:
+            if key in node:
+                yield p + (key,), parent
+            children = [(v, p + (k,), node) for k, v in node.items()
+                        if k != key and isinstance(v, (dict, list))]
+        # reversed to visit children in the same order as a recursive walk
+        stack.extend(reversed(children))
 
 
 def find_paths(key: str, d: Dict,
-               path: List[Union[str, int]] = []) -> List[Union[str, list]]:
+               path: List[Union[str, int]] = [],
+               _first_only: bool = False) -> List[Union[str, list]]:
     """Returns all paths to a specific key in a dictionary representing
        a json tree.
 
     Args:
         key (str): key to search for
         d (dict):  dictionary representing a json tree
+        _first_only (bool): stop at first path found
     Returns:
         list: path to element or None if no path found; path may contain both
               string representing keys and numbers reresenting the position
               of an element in a list.
     """
-    if type(d) != dict and type(d) != list:
-        return None
-
     paths = []
-    if type(d) == list:
-        for i, x in enumerate(d):
-            if type(x) == dict:
-                p = find_paths(key, x, path + [i])
-                if p:
-                    paths.extend(p)
-    else:
-        if key in d.keys():
-            paths.append(path + [key])
-        for k in d.keys():
-            if k == key:
-                continue
-            p = find_paths(key, d[k], path + [k])
-            if p:
-                paths.extend(p)
+    for p, _ in _iter_paths(key, d, tuple(path)):
+        paths.append(list(p))
+        if _first_only:
+            break
     return paths or None
 
 
@@ -114,24 +146,23 @@ def filter_content(content: bytes, headers: dict):
        Returns:
             bytes: changed content
     """
-    content_type = None
-    for k in headers.keys():
-        if k.lower() == "content-type":
-            content_type = headers[k]
-
-    if not content_type or content_type != "application/json":
-        return content
-    j = json.loads(content)
-    paths = find_paths('permissions', j)
-    if not paths:
+    if isinstance(headers, Message):
+        # http.server headers, lookup is already case insensitive
+        content_type = headers.get("content-type")
+    else:
+        content_type = next((headers[k] for k in headers
+                             if k.lower() == "content-type"), None)
+    if content_type != "application/json":
         return content
-    n = dict_node(paths[0][:-2], j)
-
-    if 'term' not in n.keys():
+    j = _loads(content)
+    # node above 'permissions' parent i.e. dict_node(paths[0][:-2], j),
+    # returned by the search itself without walking the tree again
+    _, n = next(_iter_paths('permissions', j), (None, None))
+    if not isinstance(n, dict) or 'term' not in n:
         return content
     n['search'] = n['term']
     del n['term']
-    return json.dumps(j).encode('utf-8')
+    return _dumps(j)
 
 
 if __name__ == "__main__":
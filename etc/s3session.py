@@ -0,0 +1,60 @@
+"""Shared boto3 session, S3 client and S3 resource
+
+   __author__: Ugo Varetto
+
+   Clients and resources are cached per endpoint and key pair so that
+   scripts performing more than one call reuse the same botocore endpoint,
+   signer and keep-alive connection pool instead of creating new ones.
+"""
+import functools
+import boto3
+import botocore.config
+
+_CONFIG = botocore.config.Config(max_pool_connections=50,
+                                 tcp_keepalive=True,
+                                 retries={'mode': 'adaptive'})
+
+
+@functools.lru_cache(maxsize=1)
+def _session() -> boto3.session.Session:
+    return boto3.session.Session()
+
+
+@functools.lru_cache(maxsize=4)
+def get_client(endpoint: str = None,
+               access_key: str = None,
+               secret_key: str = None):
+    """Return S3 client, created the first time it is requested
+
+    Args:
+        endpoint (str): endpoint url, default endpoint if None
+        access_key (str): access key, read from environment if None
+        secret_key (str): secret key, read from environment if None
+    Returns:
+        botocore.client.S3
+    """
+    return _session().client('s3',
+                             endpoint_url=endpoint,
+                             aws_access_key_id=access_key,
+                             aws_secret_access_key=secret_key,
+                             config=_CONFIG)
+
+
+@functools.lru_cache(maxsize=4)
+def get_resource(endpoint: str = None,
+                 access_key: str = None,
+                 secret_key: str = None):
+    """Return S3 resource, created the first time it is requested
+
+    Args:
+        endpoint (str): endpoint url, default endpoint if None
+        access_key (str): access key, read from environment if None
+        secret_key (str): secret key, read from environment if None
+    Returns:
+        boto3.resources.base.ServiceResource
+    """
+    return _session().resource('s3',
+                               endpoint_url=endpoint,
+                               aws_access_key_id=access_key,
+                               aws_secret_access_key=secret_key,
+                               config=_CONFIG)
@@ -1,15 +1,23 @@
 #!/usr/bin/env python3
 
 import sys
+import io
+import queue
+import threading
 import logging
-from http.server import BaseHTTPRequestHandler, HTTPServer
-import requests
+import logging.handlers
+import aiohttp
+from aiohttp import web
+from multidict import CIMultiDict
 import typing as T
-from urllib.parse import parse_qs
 from urllib.parse import urlparse
 import json
-import re
+import itertools
 import argparse
+import asyncio
+import functools
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 
 """Minimal proxy http server, uses 'logging' module, forwards requests to
    remote endpoint.
@@ -18,23 +26,31 @@ import argparse
 
    Usage: ./web-proxy.py <port> <endpoint>
 
-   HTTPServer will be printing out a 'localhost - - [date] "Request" status -'
-   at each request in addition to the data logged by the ProxyRequestHandler
-   class.
+   Requests are served by an aiohttp application, upstream requests are sent
+   through a single aiohttp.ClientSession and responses streamed back to the
+   client, all in-flight requests are multiplexed on the asyncio event loop.
+   aiohttp will be printing out a 'localhost [date] "Request" status' line
+   at each request in addition to the data logged by 'handle'.
 
-   The web server accepts /__config/... URIs to remotely configure the
-   environment, currently only /__config/endpoint=<endpoint> and
-   /__config/download-chunk-size are supported
+   The web server accepts /__config/ URIs to remotely configure the
+   environment, currently only
+   /__config/?endpoint=<endpoint>&download-chunk-size=<size> are supported,
+   the current configuration is returned in the response
 """
 
 # TODO:move all configuration parameters into _CONFIG dict and just call
 # dict.update with content of JSON config request
 
 _REMOTE_URL: str = ""
-_DOWNLOAD_CHUNK_SIZE: int = 1 << 20
+_DOWNLOAD_CHUNK_SIZE: int = 1 << 16
 _MAX_LOG_CONTENT_LENGTH: int = 1 << 10
 _FILTER_CONTENT = False
 _MUTE = False
+_FILTER_THREADS: int = 4
+_CONFIG_PATH: str = "/__config/"
+_CONFIG_TEMPLATE: bytes = \
+    b"<html><head></head><body><h2>Configuration</h2>" + \
+    b"<p>Remote URL: %s</p><p>Download buffer size: %d</p></body></html>"
 
 # NOTE: NOT IMPLEMENTED YET
 # _AWS_V4_SIGNING = False
@@ -44,238 +60,323 @@ _MUTE = False
 # _VERIFY_SSL = True
 # _MAX_RETRIES = 1
 
-
-def filter_content(content: bytes, headers: dict):
-    global _FILTER_CONTENT
-    if not _FILTER_CONTENT:
-        return content
-    return filter_module.filter_content(content, headers)
-
-
-class ProxyRequestHandler(BaseHTTPRequestHandler):
-
-    # incremented at each request, cannot be an instance, because a new
-    # instance is created at each http request received
-    count: int = 0
-    log_function: T.Callable = logging.info
-
-    # Private interface ###################################################
-
-    def log_message(self, format: str = "", *args):
-        s = format
-        for a in args:
-            s = s.replace('%s', a, 1)
-        ProxyRequestHandler.log_function(s)
-
-    def _log(self, msg):
-        global _MUTE
-        if _MUTE:
-            return
-        self.log_message(msg)
-
-    def _print_text_header(self):
-        headers_text = ""
-        for (k, v) in self.headers.items():
-            headers_text += f'{k}: {v}\n'
-        return headers_text
-
-    def _print_reqline_and_headers(self):
-        ProxyRequestHandler.count += 1
-        return "\n===> " + ">"*20 + '\n' + \
-               f"**REQUEST #: {ProxyRequestHandler.count}\n" + \
-               "------REQUEST LINE:\n" + \
-               self.requestline + "\n\n" + \
-               "------HEADERS" + "\n" + \
-               self._print_text_header()
-
-    def _print_response(self, resp):
-        return "\n" + "<"*20 + ' <===\n' + \
-               f"**RESPONSE #: {ProxyRequestHandler.count}\n" + \
-               "------STATUS: " + str(resp.status_code) + '\n' + \
-               "------HEADERS" + "\n" + \
-               str(resp.headers) + "\n" + \
-               "------CONTENT\n" + resp.text
-
-    def _send_default_response(self, content=None, method=None):
-        # method not currently used
-        if not content:
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(("Request line: " + self.requestline + '\n' +
-                              "\nRequest Headers:\n" + str(self.headers) + '\n')
-                             .encode())
-        else:
-            self.send_response(200)
-            content_length_sent = False
-            for k, v in self.headers.items():
-                if k.lower() == "content-length":
-                    self.send_header(k, len(content))
-                    content_length_sent = True
-                else:
-                    self.send_header(k, v)
-            if not content_length_sent:
-                self.send_header("Content-Length", len(content))
-            self.end_headers()
-            self.wfile.write(content)
-
-    def _inject_auth(self, headers):
-        return headers
-
-    def _parse_headers(self):
-        headers = self.headers
-        headers['Host'] = self.host
-        return self._inject_auth(headers)
-
-    def _send_headers(self, headers):
-        for (k, v) in headers.items():
-            self.send_header(k, v)
-
-    def _url(self):
-        r = requests.head(self.remote_url + self.path, allow_redirects=True)
-        return r.url
-
-    def _send_response(self, resp):
-        msg = "\n" + str(resp.headers) + "\n"  # self._print_response(resp)
-        self._log("RESPONSE HEADERS\n" + 20*"=" + "\n" + msg)
-        msg = ""
-        self.send_response(resp.status_code)
-        self._send_headers(resp.headers)
-        self.end_headers()
-        count = 0
-        size = 0
-        for i in resp.iter_content(chunk_size=self.chunk_size):
-            self.wfile.write(i)
-            count += 1
+# incremented at each request, itertools.count is a C iterator and all
+# handlers run on the same event loop thread, no locking required
+_counter: T.Iterator[int] = itertools.count(1)
+logger: logging.Logger = logging.getLogger(__name__)
+log_function: T.Callable = logger.info
+_LOG_FLUSH_INTERVAL: float = 5  # seconds
+_LOG_BUFFER_SIZE: int = 1 << 13
+
+# created at application startup, shared by all handlers
+_CLIENT_SESSION: aiohttp.ClientSession = None
+_MAX_CONNECTIONS: int = 256
+_MAX_CONNECTIONS_PER_HOST: int = 64
+# remote endpoint is fixed, its address resolved once every few minutes
+_DNS_CACHE_TTL: int = 300  # seconds
+_KEEPALIVE_TIMEOUT: float = 30  # seconds
+# content filters are blocking functions, run on a bounded thread pool
+# instead of the event loop thread
+_FILTER_EXECUTOR: ThreadPoolExecutor = None
+# filter_content function of the module passed on the command line
+_FILTER_FN: T.Callable = None
+
+# connection-specific headers, not forwarded, lowercase
+_HOP_BY_HOP_HEADERS = frozenset(("connection", "keep-alive",
+                                 "transfer-encoding"))
+# not forwarded upstream, host is replaced and content length computed
+# from the forwarded data
+_NOT_FORWARDED_HEADERS = frozenset(("host", "content-length",
+                                    "transfer-encoding"))
+
+
+# Private interface ###################################################
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    """Stream handler not flushing after each record, buffered content is
+       written every _LOG_FLUSH_INTERVAL seconds by the flushing thread
+    """
+
+    def flush(self):
+        pass
+
+    def flush_buffer(self):
+        with self.lock:
+            self.stream.flush()
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler enqueueing records as they are, the queue is consumed
+       in the same process so 'msg % args' and formatting are left to the
+       handler invoked by the QueueListener thread
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _start_logging(level=logging.INFO):
+    """Handlers only enqueue records, formatting and writing is performed
+       by a QueueListener thread into a buffered stream
+
+    Returns:
+        Callable: function to call at exit to stop logging and flush
+    """
+    q = queue.SimpleQueue()
+    stream = io.TextIOWrapper(
+        io.BufferedWriter(io.FileIO(sys.stderr.fileno(), 'w', closefd=False),
+                          buffer_size=_LOG_BUFFER_SIZE))
+    handler = _BufferedStreamHandler(stream)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root = logging.getLogger()
+    root.addHandler(_InProcessQueueHandler(q))
+    root.setLevel(level)
+    listener = logging.handlers.QueueListener(q, handler,
+                                              respect_handler_level=True)
+    listener.start()
+    stop = threading.Event()
+
+    def flush_periodically():
+        while not stop.wait(_LOG_FLUSH_INTERVAL):
+            handler.flush_buffer()
+
+    threading.Thread(target=flush_periodically, daemon=True).start()
+
+    def stop_logging():
+        stop.set()
+        listener.stop()
+        handler.flush_buffer()
+
+    return stop_logging
+
+
+def _log(msg, *args):
+    """Log message, 'msg' can be a function returning the message text,
+       invoked only when logging is enabled; 'args' are merged into the
+       message with a single 'msg % args' by the logging module, only when
+       the record is formatted on the QueueListener thread
+    """
+    global _MUTE
+    if _MUTE or not logger.isEnabledFor(logging.INFO):
+        return
+    log_function(msg() if callable(msg) else msg, *args)
+
+
+def _print_text_header(headers):
+    return "".join(f'{k}: {v}\n' for (k, v) in headers.items())
+
+
+def _request_line(request: web.Request) -> str:
+    return f"{request.method} {request.path_qs} " + \
+           f"HTTP/{request.version.major}.{request.version.minor}"
+
+
+def _print_reqline_and_headers(request: web.Request, count: int):
+    return "\n===> " + ">"*20 + '\n' + \
+           f"**REQUEST #: {count}\n" + \
+           "------REQUEST LINE:\n" + \
+           _request_line(request) + "\n\n" + \
+           "------HEADERS" + "\n" + \
+           _print_text_header(request.headers)
+
+
+def _print_response(resp: aiohttp.ClientResponse, count: int, text: str):
+    return "\n" + "<"*20 + ' <===\n' + \
+           f"**RESPONSE #: {count}\n" + \
+           "------STATUS: " + str(resp.status) + '\n' + \
+           "------HEADERS" + "\n" + \
+           str(resp.headers) + "\n" + \
+           "------CONTENT\n" + text
+
+
+def _copy_headers(headers, excluded: T.FrozenSet[str]) -> CIMultiDict:
+    # single multidict construction from a list of tuples, instead of
+    # copying all headers and removing the excluded ones one by one
+    return CIMultiDict([(k, v) for k, v in headers.items()
+                        if k.lower() not in excluded])
+
+
+def _send_default_response(request: web.Request, content=None,
+                           method=None) -> web.Response:
+    # method not currently used
+    if not content:
+        return web.Response(
+            status=200,
+            content_type='text/plain',
+            body=("Request line: " + _request_line(request) + '\n' +
+                  "\nRequest Headers:\n" +
+                  _print_text_header(request.headers) + '\n').encode())
+    else:
+        headers = _copy_headers(request.headers, _HOP_BY_HOP_HEADERS)
+        headers["Content-Length"] = str(len(content))
+        return web.Response(status=200, headers=headers, body=content)
+
+
+@functools.lru_cache(maxsize=8)
+def _host(url: str) -> str:
+    # remote url can only change through configuration, parse it once
+    return urlparse(url).netloc
+
+
+def _parse_headers(request: web.Request, host: str) -> CIMultiDict:
+    headers = _copy_headers(request.headers, _NOT_FORWARDED_HEADERS)
+    headers['Host'] = host
+    return headers
+
+
+async def _send_response(request: web.Request,
+                         resp: aiohttp.ClientResponse,
+                         chunk_size: int,
+                         count: int) -> web.StreamResponse:
+    headers = _copy_headers(resp.headers, _HOP_BY_HOP_HEADERS)
+    web_resp = web.StreamResponse(status=resp.status, headers=headers)
+    await web_resp.prepare(request)
+    writes = 0
+    size = 0
+    # only the first bytes of the body are logged, captured while streaming
+    head = bytearray()
+    head_size = _MAX_LOG_CONTENT_LENGTH \
+        if not _MUTE and logger.isEnabledFor(logging.INFO) else 0
+    # data received from upstream is coalesced into 'chunk_size' writes,
+    # no write per small network read; reads already large enough are
+    # written as received, without copying them into the buffer.
+    # A new buffer is used after each write: the transport may still hold
+    # a view of the previous one when the socket buffer is full
+    buf = bytearray()
+    async for i in resp.content.iter_any():
+        if len(head) < head_size:
+            head += i[:head_size - len(head)]
+        if not buf and len(i) >= chunk_size:
+            await web_resp.write(i)
+            writes += 1
             size = max(size, len(i))
-        msg += "\nnumber of chunks: " + str(count) + \
-               "\nmax chunk length: " + str(size)
-        self._log(msg)
-
-        # encoding = None
-        # for k in resp.headers.keys():
-        #     if k.lower() == "transfer-encoding":
-        #         encoding = resp.headers[k]
-        # if encoding and encoding.lower().strip() == "chunked":
-        #     count = 0
-        #     size = 0
-        #     for i in resp.iter_content(chunk_size=self.chunk_size):
-        #         p = bytearray(f"{len(i):x}\r\n".encode('utf-8'))
-        #         p.extend(i)
-        #         p.extend("\r\n".encode())
-        #         self.wfile.write(p)
-        #         count += 1
-        #         size = max(size, len(i))
-        #     self.wfile.write(f"{0:x}\r\n\r\n".encode())
-        #     self.wfile.write("\r\n".encode())
-        #     msg += f"\nNumber of chunks: {count}, max chunk size: {size} "+ \
-        #            "bytes\n\n"
-        # else:
-        #     msg += str(resp.headers)
-        #     self.wfile.write(resp.content)
-        #     msg += "\ncontent length: " + str(len(resp.content))
-
-    def _handle_rest_request(self, json_content):
-        config = json.loads(json_content)
-        global _REMOTE_URL
-        global _DOWNLOAD_CHUNK_SIZE
-        result = "no recongnized parameter name in request"
-        if "_REMOTE_URL" in config.keys():
-            _REMOTE_URL = config["_REMOTE_URL"]
-            result = "OK"
-        if "_DOWNLOAD_CHUNK_SIZE" in config.keys():
-            _DOWNLOAD_CHUNK_SIZE = config["_DOWNLOAD_CHUNK_SIZE"]
-            result = "OK"
-        if "get_config" in config.keys():
-            result = f'{{"_REMOTE_URL": "{_REMOTE_URL}",' + \
-                     f'"_DOWNLOAD_CHUNK_SIZE": "{_DOWNLOAD_CHUNK_SIZE}"' + \
-                     "}}"
-            return result
-
-        return f'{{"result": "{result}"}}'
-
-    def _read_content(self):
-        r = re.compile("[Cc]ontent-[Ll]ength")
-        cl = list(filter(r.match, self.headers.keys()))
-        if len(cl) == 0:
-            return None
-        return self.rfile.read(int(self.headers[cl[0]]))
-
-    # Public interface ###################################################
-
-    def __init__(self, request, client_address, server):
-        self.remote_url = _REMOTE_URL
-        self.chunk_size = _DOWNLOAD_CHUNK_SIZE
-        parsed_uri = urlparse(self.remote_url)
-        self.host = parsed_uri.netloc
-        super(ProxyRequestHandler, self).__init__(
-            request, client_address, server)
-
-    def do_GET(self):
-        self._log(self._print_reqline_and_headers())
-        if self.remote_url:
-            req_headers = self._parse_headers()
-            resp = requests.get(self._url(), headers=req_headers, stream=True)
-            self._send_response(resp)
-        else:
-            self._send_default_response()
-
-    def do_HEAD(self):
-        self._log(self._print_reqline_and_headers())
-        if self.remote_url:
-            req_headers = self._parse_headers()
-            resp = requests.head(self._url(), headers=req_headers, stream=True)
-            self._send_response(resp)
-        else:
-            self._send_default_response()
-
-    def do_POST(self):
-        self._log(self._print_reqline_and_headers())
-        from array import array
-        content = self._read_content()
-        global _MAX_LOG_CONTENT_LENGTH
-        if len(content) < _MAX_LOG_CONTENT_LENGTH:
-            log_msg = "------REQUEST_BODY" + "\n" + \
-                      f"{str(content)}"
-            self._log(log_msg)
-        if self.remote_url:
-            req_headers = self._parse_headers()
-            resp = requests.post(self._url(),
-                                 data=filter_content(content, self.headers),
-                                 headers=req_headers,
-                                 stream=True)
-            self._send_response(resp)
-        else:
-            self._send_default_response(filter_content(content, self.headers))
-
-    def do_PUT(self):
-        self._log(self._print_reqline_and_headers())
-        from array import array
-        content = self._read_content()
-        global _MAX_LOG_CONTENT_LENGTH
-        if len(content) < _MAX_LOG_CONTENT_LENGTH:
-            log_msg = "------REQUEST_BODY" + "\n" + \
-                      f"{str(content)}"
-            self._log(log_msg)
-        if self.remote_url:
-            req_headers = self._parse_headers()
-            resp = requests.put(self._url(),
-                                data=filter_content(content, self.headers),
-                                headers=req_headers,
-                                stream=True)
-            self._send_response(resp)
-        else:
-            self._send_default_response(filter_content(content, self.headers))
-
-    def do_DELETE(self):
-        self._log(self._print_reqline_and_headers())
-        if self.remote_url:
-            req_headers = self._parse_headers()
-            resp = requests.delete(
-                self._url(), headers=req_headers, stream=True)
-            self._send_response(resp)
+            continue
+        buf += i
+        if len(buf) >= chunk_size:
+            await web_resp.write(buf)
+            writes += 1
+            size = max(size, len(buf))
+            buf = bytearray()
+    if buf:
+        await web_resp.write(buf)
+        writes += 1
+        size = max(size, len(buf))
+    await web_resp.write_eof()
+    _log(lambda: _print_response(resp, count, repr(bytes(head))))
+    _log("\nnumber of chunks: %d\nmax chunk length: %d", writes, size)
+    return web_resp
+
+
+def _send_config_response() -> web.Response:
+    return web.Response(
+        status=200, content_type='text/html', charset='utf-8',
+        body=_CONFIG_TEMPLATE % (_REMOTE_URL.encode(), _DOWNLOAD_CHUNK_SIZE))
+
+
+def _handle_configuration(request: web.Request) -> web.Response:
+    # query string already parsed by aiohttp into a multidict
+    global _REMOTE_URL
+    global _DOWNLOAD_CHUNK_SIZE
+    query = request.query
+    if "download-chunk-size" in query:
+        try:
+            chunk_size = int(query["download-chunk-size"])
+        except ValueError:
+            raise web.HTTPBadRequest(text="invalid download-chunk-size")
+        if chunk_size <= 0:
+            raise web.HTTPBadRequest(text="invalid download-chunk-size")
+        _DOWNLOAD_CHUNK_SIZE = chunk_size
+    if "endpoint" in query:
+        _REMOTE_URL = query["endpoint"]
+    return _send_config_response()
+
+
+def _handle_rest_request(json_content):
+    config = json.loads(json_content)
+    global _REMOTE_URL
+    global _DOWNLOAD_CHUNK_SIZE
+    result = "no recongnized parameter name in request"
+    if "_REMOTE_URL" in config.keys():
+        _REMOTE_URL = config["_REMOTE_URL"]
+        result = "OK"
+    if "_DOWNLOAD_CHUNK_SIZE" in config.keys():
+        _DOWNLOAD_CHUNK_SIZE = config["_DOWNLOAD_CHUNK_SIZE"]
+        result = "OK"
+    if "get_config" in config.keys():
+        return json.dumps({"_REMOTE_URL": _REMOTE_URL,
+                           "_DOWNLOAD_CHUNK_SIZE": _DOWNLOAD_CHUNK_SIZE})
+
+    return json.dumps({"result": result})
+
+
+async def _read_content(request: web.Request):
+    # request.content_length is parsed from the header by aiohttp, no
+    # header scan; chunked requests have no length but do have a body
+    if request.content_length is None and not request.body_exists:
+        return None
+    return await request.read()
+
+
+# Public interface ###################################################
+
+async def handle(request: web.Request) -> web.StreamResponse:
+    if request.path == _CONFIG_PATH:
+        return _handle_configuration(request)
+    count = next(_counter)
+    remote_url = _REMOTE_URL
+    chunk_size = _DOWNLOAD_CHUNK_SIZE
+    _log(lambda: _print_reqline_and_headers(request, count))
+    content = None
+    streamed = False
+    if request.method in ("POST", "PUT"):
+        length = request.content_length
+        # the whole body is read only when needed: echo response, content
+        # filtering or logging of small bodies; otherwise it is streamed
+        # to the remote endpoint while it is received
+        if not remote_url or _FILTER_CONTENT or \
+                (length is not None and length < _MAX_LOG_CONTENT_LENGTH):
+            content = await _read_content(request) or b""
+            if len(content) < _MAX_LOG_CONTENT_LENGTH:
+                _log(lambda: f"------REQUEST_BODY\n{content!r}")
+            if _FILTER_CONTENT:
+                content = await asyncio.get_running_loop().run_in_executor(
+                    _FILTER_EXECUTOR, _FILTER_FN, content,
+                    request.headers)
         else:
-            self._send_default_response()
+            content = request.content
+            streamed = True
+    if not remote_url:
+        return _send_default_response(request, content, request.method)
+    req_headers = _parse_headers(request, _host(remote_url))
+    if streamed and request.content_length is not None:
+        # length is known, forward it instead of using chunked encoding
+        req_headers['Content-Length'] = str(request.content_length)
+    # redirects are followed by the forwarded request itself, no
+    # additional upstream round-trip to resolve the url first
+    async with _CLIENT_SESSION.request(request.method,
+                                       remote_url + request.path_qs,
+                                       headers=req_headers,
+                                       data=content,
+                                       allow_redirects=True) as resp:
+        return await _send_response(request, resp, chunk_size, count)
+
+
+async def _start_client_session(app: web.Application):
+    global _CLIENT_SESSION
+    # content is forwarded as received, no decompression and only the
+    # client headers are sent, no default encoding or agent; keep-alive
+    # connections are pooled and reused across requests
+    connector = aiohttp.TCPConnector(limit=_MAX_CONNECTIONS,
+                                     limit_per_host=_MAX_CONNECTIONS_PER_HOST,
+                                     ttl_dns_cache=_DNS_CACHE_TTL,
+                                     keepalive_timeout=_KEEPALIVE_TIMEOUT)
+    _CLIENT_SESSION = aiohttp.ClientSession(
+        connector=connector, auto_decompress=False,
+        skip_auto_headers=("Accept-Encoding", "User-Agent"))
+
+
+async def _close_client_session(app: web.Application):
+    await _CLIENT_SESSION.close()
 
 
 if __name__ == "__main__":
@@ -286,6 +387,13 @@ if __name__ == "__main__":
                     'modify content')
     parser.add_argument('-p', '--port', dest='port', type=int,
                         required=True, help='tcp port')
+    parser.add_argument('-t', '--threads-http', dest='threads', type=int,
+                        required=False, default=_FILTER_THREADS,
+                        help='max number of threads applying content filter')
+    parser.add_argument('-c', '--max-connections', dest='connections',
+                        type=int, required=False,
+                        default=_MAX_CONNECTIONS_PER_HOST,
+                        help='max number of pooled connections to endpoint')
     parser.add_argument('-e', '--endpoint', dest='endpoint', type=str,
                         required=False, help='address to forward requests to')
     parser.add_argument('-f', '--content-filter', dest='filter', type=str,
@@ -296,27 +404,30 @@ if __name__ == "__main__":
     args = parser.parse_args()
     if args.endpoint:
         _REMOTE_URL = args.endpoint
+    _MAX_CONNECTIONS_PER_HOST = args.connections
+    _MAX_CONNECTIONS = max(_MAX_CONNECTIONS, _MAX_CONNECTIONS_PER_HOST)
     if args.filter:
-        exec(f"import {args.filter} as filter_module")
+        _FILTER_FN = importlib.import_module(args.filter).filter_content
         _FILTER_CONTENT = True
+        _FILTER_EXECUTOR = ThreadPoolExecutor(max_workers=args.threads)
     port = args.port
-    httpd = HTTPServer(('', port), ProxyRequestHandler)
+    app = web.Application()
+    app.on_startup.append(_start_client_session)
+    app.on_cleanup.append(_close_client_session)
+    app.router.add_route('*', '/{path:.*}', handle)
     print(f"Starting http server on port {port}" +
           (f", forwarding requests to {_REMOTE_URL}" if _REMOTE_URL else ""))
-    logging.basicConfig(level=logging.INFO)
+    stop_logging = _start_logging(logging.INFO)
     try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\rexiting...")  # without '\r' '^C' is shown
-        sys.exit(0)
+        web.run_app(app, port=port, print=None)
     except Exception as e:
-        print("Error: " + e, file=sys.stderr)
+        print("Error: " + str(e), file=sys.stderr)
+    finally:
+        stop_logging()
 
 # TODO: currently no way to add a control path
-# if "application/json" in [v.lower() for v in self.headers.values()]:
-#     ret = self._handle_rest_request(content)
-#     self.send_response(code=200)
-#     self.send_header("Content-Type", "application/json")
-#     self.end_headers()
-#     self.wfile.write(ret.encode('utf-8'))
-#     return
+# if request.headers.get("Content-Type", "").lower().startswith(
+#         "application/json"):
+#     ret = _handle_rest_request(content)
+#     return web.Response(status=200, content_type="application/json",
+#                         body=ret.encode('utf-8'))
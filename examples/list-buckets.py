@@ -13,7 +13,7 @@ if __name__ == "__main__":
     config_file = sys.argv[1]
 
     # payload, empty in this case
-    payload_hash = s3.hash('')
+    payload_hash = s3.EMPTY_SHA256
 
     # build request
     request_url, headers = s3.build_request_url(
@@ -33,5 +33,5 @@ if __name__ == "__main__":
 
     # parse and print XML response
     print("\n")
-    print(s3.xml_to_text(r.text))
+    print(s3.xml_to_text(r.content))
     print("\n")
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import s3v4_rest as s3
-import requests
 import json
 #https://github.com/ceph/ceph/blob/e68c60ac73cd34fbd8b712258796f645bf75fcb9/doc/radosgw/pubsub-module.rst#s3-compliant-notifications
 # FROM Ceph docs
@@ -23,7 +22,7 @@ import json
 if __name__ == "__main__":
     # read configuration information
     with open("config/s3-credentials2.json", "r") as f:
-        credentials = json.loads(f.read())
+        credentials = json.load(f)
 
     push_endpoint = "http://146.118.66.215:80"
 
@@ -46,7 +45,7 @@ if __name__ == "__main__":
         config=credentials,
         req_method="POST",
         parameters=None,  #{"topic": "create_object", "events": "OBJECT_CREATE"},
-        payload_hash=s3.hash(payload),  #s3.UNSIGNED_PAYLOAD,
+        payload_hash=s3.EMPTY_SHA256,  #s3.UNSIGNED_PAYLOAD,
         payload_length=0,  # will be added by requests.post
         uri_path=f"/")
         # additional_headers={"Content-Type":
@@ -56,7 +55,8 @@ if __name__ == "__main__":
     print("Request URL = " + request_url)
     print(headers)
     print(payload)
-    r = requests.post(request_url, data=parameters, headers=headers)
+    with s3.s3_session() as session:
+        r = session.post(request_url, data=parameters, headers=headers)
     # NOTE: requests works equally well if instead of payload a dict with
     #       the required parameter/value configuration is passed directly
     #       to the 'data' parameter, hashing of payload must always be
@@ -68,5 +68,5 @@ if __name__ == "__main__":
         print(r.text)
         # parse and print XML response
         print("\n")
-        print(s3.xml_to_text(r.text))
+        print(s3.xml_to_text(r.content))
         print("\n")
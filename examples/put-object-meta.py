@@ -27,7 +27,7 @@ if __name__ == "__main__":
         print(r.text)
         # parse and print XML response
         print("\n")
-        print(s3.xml_to_text(r.text))
+        print(s3.xml_to_text(r.content))
         print("\n")
 
     print(r.headers)
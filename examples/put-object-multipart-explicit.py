@@ -37,28 +37,67 @@ import s3v4_rest as s3
 import requests
 import json
 import os
-from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+_TIMEOUT = (5, 60)  # connect, read timeouts in seconds
 
 
 def bytes_from_file(fname):
-    """Use this function to read bytes from files when using 'data' instead of
-       'files' in requests.* functions
+    """Use this function to read bytes from files when content is needed in
+       memory e.g. to compute the payload hash, to upload files pass the
+       file object returned by 'open' to the 'data' parameter instead
     """
-    data = array('B')
-
     with open(fname, 'rb') as f:
-        data.fromfile(f, os.stat(fname).st_size)
+        return f.read()
 
-    return data.tobytes()
+
+def upload_part(session, credentials, uri_path, upload_id, partname, part,
+                number_of_chunks):
+    """Upload one part, returns (part number, ETag) tuple
+
+       Parts of the same multipart upload are independent and can be sent
+       concurrently, each one through one of the pooled session connections
+    """
+    # raw part content in body, streamed from file; request prepared and
+    # sent directly through the session adapter, no per-request merging of
+    # environment settings, which are not used here
+    with open(partname, 'rb') as f:
+        # size of opened file, no additional path lookup
+        payload_size = os.fstat(f.fileno()).st_size
+        request_url, headers = s3.build_request_url(
+            config=credentials,
+            req_method="PUT",
+            parameters={"partNumber": str(part), "uploadId": upload_id},
+            payload_hash=s3.UNSIGNED_PAYLOAD,
+            payload_length=payload_size,
+            uri_path=uri_path,
+        )
+
+        print(f"Sending part {part} of {number_of_chunks}")
+        prepared = session.prepare_request(
+            requests.Request('PUT', request_url, data=f, headers=headers))
+        r = session.send(prepared, timeout=_TIMEOUT)
+    print(f"status: {r.status_code}")
+    if r.status_code != 200:
+        print(r.text)
+        print(r.headers)
+
+    tag_id = s3.get_tag_id(r.headers)
+    print(tag_id)
+    return (part, tag_id)
 
 
 if __name__ == "__main__":
     # read configuration information
     with open("config/s3-credentials2.json", "r") as f:
-        credentials = json.loads(f.read())
+        credentials = json.load(f)
 
     bucket_name = "uv-bucket-3"
     key_name = "key-multipart-test10"
+    number_of_chunks = 2  # == number of files
+
+    # all requests reuse pooled connections, one per concurrent part upload
+    session = s3.s3_session(pool_maxsize=number_of_chunks)
 
     # request #1 initiate multipart upload
 
@@ -74,44 +113,23 @@ if __name__ == "__main__":
     )
 
     print("Sending begin upload request...")
-    r = requests.post(request_url, '', headers=headers)
+    r = session.post(request_url, '', headers=headers)
     print(f"Status code: {r.status_code}")
     if r.status_code != 200:
         print(r.text)
         print(r.headers)
-    request_id = s3.get_upload_id(r.text)
+    request_id = s3.get_upload_id(r.content)
     print(f"UploadId: {request_id}")
     print("Sending multi-part requests...")
     # 2 SEND PARTS:
     fname = "tmp-blob"  # prefix
-    parts = []
-    number_of_chunks = 2  # == number of files
-    for part in range(1, number_of_chunks + 1):
-        partname = fname + str(part)
-        
-        payload_size = os.stat(partname).st_size
-        request_url, headers = s3.build_request_url(
-            config=credentials,
-            req_method="PUT",
-            parameters={"partNumber": str(part), "uploadId": request_id},
-            payload_hash=s3.UNSIGNED_PAYLOAD,
-            payload_length=payload_size,
-            uri_path=f"/{bucket_name}/{key_name}",
-        )
-
-        print(f"Sending part {part} of {number_of_chunks}")
-        files = {'file': (partname, open(partname, 'rb'))}
-        r = requests.put(request_url,
-                         files=files,
-                         headers=headers)
-        print(f"status: {r.status_code}")
-        if r.status_code != 200:
-            print(r.text)
-            print(r.headers)
-
-        tag_id = s3.get_tag_id(r.headers)
-        print(tag_id)
-        parts.append((part, tag_id))
+    with ThreadPoolExecutor(max_workers=number_of_chunks) as executor:
+        parts = sorted(executor.map(
+            lambda part: upload_part(session, credentials,
+                                     f"/{bucket_name}/{key_name}",
+                                     request_id, fname + str(part), part,
+                                     number_of_chunks),
+            range(1, number_of_chunks + 1)))
 
     # 3 END TRANSACTION
     # compose XML request with part list
@@ -127,9 +145,10 @@ if __name__ == "__main__":
     )
 
     print("Sending end upload request...")
-    r = requests.post(request_url,
-                      data=multipart_list,
-                      headers=headers)
+    prepared = session.prepare_request(
+        requests.Request('POST', request_url, data=multipart_list,
+                         headers=headers))
+    r = session.send(prepared, timeout=_TIMEOUT)
 
     print(f"status: {r.status_code}")
     if r.status_code != 200:
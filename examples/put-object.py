@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import s3v4_rest as s3
-import requests
 import json
+import os
 
 # PutObject PUT /bucket/key + data in body and multipart upload
 # generate 'tmp-blob' file with
@@ -10,12 +10,15 @@ import json
 if __name__ == "__main__":
     # read configuration information
     with open("config/s3-credentials2.json", "r") as f:
-        credentials = json.loads(f.read())
+        credentials = json.load(f)
 
     bucket_name = "uv-bucket-1"
     key_name = "key-3"
     payload = "key-3 payload"
 
+    # all requests reuse the same connection
+    session = s3.s3_session()
+
     # payload, empty in this case
     payload_hash = s3.hash(payload)
 
@@ -32,7 +35,7 @@ if __name__ == "__main__":
     # send request and print response
     print("Request URL = " + request_url)
     print(headers)
-    r = requests.put(request_url, payload, headers=headers)
+    r = session.put(request_url, payload, headers=headers)
 
     print("\nResponse")
     print(f"Response code: {r.status_code}\n")
@@ -40,7 +43,7 @@ if __name__ == "__main__":
         print(r.text)
         # parse and print XML response
         print("\n")
-        print(s3.xml_to_text(r.text))
+        print(s3.xml_to_text(r.content))
         print("\n")
 
     # build request #2: binary file read from filesytem, no hashing
@@ -49,14 +52,15 @@ if __name__ == "__main__":
         req_method="PUT",
         parameters=None,
         payload_hash=s3.UNSIGNED_PAYLOAD,
-        payload_length=len(payload),
+        payload_length=os.stat("tmp-blob").st_size,
         uri_path=f"/{bucket_name}/{key_name}",
     )
 
-    # send request and print response
+    # send request and print response, file content streamed from disk
     print("Request URL = " + request_url)
     print(headers)
-    r = requests.put(request_url, data=open("tmp-blob", "rb"), headers=headers)
+    with open("tmp-blob", "rb") as f:
+        r = session.put(request_url, data=f, headers=headers)
 
     print("\nResponse")
     print(f"Response code: {r.status_code}\n")
@@ -64,7 +68,7 @@ if __name__ == "__main__":
         print(r.text)
         # parse and print XML response
         print("\n")
-        print(s3.xml_to_text(r.text))
+        print(s3.xml_to_text(r.content))
         print("\n")
 
     print(r.headers)
@@ -12,45 +12,61 @@ import base64
 import hmac
 import requests
 import json
-import xml.etree.ElementTree as ET
-
-
-# standard signing functions from AWS
-def sign(key, msg):
-    return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
-
-
-def get_signature(key, dateStamp, regionName, serviceName):
-    kDate = sign(('AWS4' + key).encode('utf-8'), dateStamp)
-    kRegion = sign(kDate, regionName)
-    kService = sign(kRegion, serviceName)
-    kSigning = sign(kService, 'aws4_request')
+try:
+    from lxml import etree as ET  # libxml2 parser, faster on large listings
+except ImportError:
+    import xml.etree.ElementTree as ET
+from functools import lru_cache
+
+# sha256 hash of empty payload
+EMPTY_SHA256 = 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+
+# pooled keep-alive connections, shared by all requests
+SESSION = requests.Session()
+
+
+# standard signing key derivation from AWS
+# the signing key only depends on the arguments, reused for all requests
+# signed in the same day
+@lru_cache(maxsize=8)
+def get_signature(key, dateStamp, regionName, serviceName,
+                  _digest=hmac.digest):
+    # hmac.digest bound to local name
+    kDate = _digest(('AWS4' + key).encode('utf-8'),
+                    dateStamp.encode('utf-8'), 'sha256')
+    kRegion = _digest(kDate, regionName.encode('utf-8'), 'sha256')
+    kService = _digest(kRegion, serviceName.encode('utf-8'), 'sha256')
+    kSigning = _digest(kService, b'aws4_request', 'sha256')
     return kSigning
 
 
 # ElementTree prefixes tags with a namespace if present
 def clean_xml_tag(tag):
-    closing_brace_index = tag.index('}')
-    return tag if not closing_brace_index else tag[closing_brace_index+1:]
+    # tags without namespace prefix are returned unchanged
+    _, sep, tail = tag.partition('}')
+    return tail if sep else tag
 
 
-# note: Python as a limit on the recursion level it can handle,
-#      this is just implemented like this without returning functions
-#      or using stacks to keep the code simple
+# depth-first traversal with explicit stack, no recursion limit on
+# nesting level
 def print_xml_tree(node, indentation_level=0, filter=lambda t: True):
     BLANKS = 2
-    indent = indentation_level * BLANKS
-    if filter(node.tag):
-        print(" "*indent + f"{clean_xml_tag(node.tag)}: {node.text}")
-    for child in node:
-        print_xml_tree(child, indentation_level + 1)
+    stack = [(node, indentation_level)]
+    while stack:
+        node, level = stack.pop()
+        if filter(node.tag):
+            print(" "*(level * BLANKS) +
+                  f"{clean_xml_tag(node.tag)}: {node.text}")
+        # lxml comments have non-string tags, dropped by ElementTree
+        stack.extend((c, level + 1) for c in reversed(node)
+                     if isinstance(c.tag, str))
 
 
 if __name__ == "__main__":
 
     # read configuration information
     with open("config/s3-credentials-local2.json", "r") as f:
-        credentials = json.loads(f.read())
+        credentials = json.load(f)
 
     protocol = credentials['protocol']
     host = credentials['host']
@@ -69,63 +85,53 @@ if __name__ == "__main__":
     request_parameters = ''
 
     # dates for headers credential string
-    t = datetime.datetime.utcnow()
-    amzdate = t.strftime('%Y%m%dT%H%M%SZ')
-    datestamp = t.strftime('%Y%m%d')  # Date w/o time, used in credential scope
+    t = datetime.datetime.now(datetime.timezone.utc)
+    amzdate = f"{t.year:04d}{t.month:02d}{t.day:02d}T" + \
+              f"{t.hour:02d}{t.minute:02d}{t.second:02d}Z"
+    datestamp = amzdate[:8]  # Date w/o time, used in credential scope
 
     # canonical URI
     canonical_uri = '/'
     canonical_querystring = request_parameters
 
     # payload, empty in this case
-    payload_hash = hashlib.sha256(('').encode('utf-8')).hexdigest()
+    payload_hash = EMPTY_SHA256
 
     # headers: canonical and singned header list
     canonical_headers = \
-        'host:' + host + '\n' + \
-        "x-amz-content-sha256:" + payload_hash + '\n' + \
-        'x-amz-date:' + amzdate + '\n'
+        f"host:{host}\nx-amz-content-sha256:{payload_hash}\n" + \
+        f"x-amz-date:{amzdate}\n"
 
     signed_headers = 'host;x-amz-content-sha256;x-amz-date'
 
     # canonical request
-    canonical_request = \
-        method + "\n" +  \
-        canonical_uri + '\n' +  \
-        canonical_querystring + '\n' + \
-        canonical_headers + '\n' +  \
-        signed_headers + '\n' +  \
-        payload_hash
+    canonical_request = "\n".join([method,
+                                   canonical_uri,
+                                   canonical_querystring,
+                                   canonical_headers,
+                                   signed_headers,
+                                   payload_hash])
 
     algorithm = 'AWS4-HMAC-SHA256'
-    credential_scope = \
-        datestamp + \
-        '/' + \
-        region + \
-        '/' + \
-        service + \
-        '/' + \
-        'aws4_request'
+    credential_scope = "/".join([datestamp, region, service, 'aws4_request'])
 
     # string to sign
-    string_to_sign = \
-        algorithm + '\n' + \
-        amzdate + '\n' + \
-        credential_scope + '\n' + \
-        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+    string_to_sign = "\n".join([
+        algorithm,
+        amzdate,
+        credential_scope,
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()])
 
     signing_key = get_signature(secret_key, datestamp, region, service)
 
     # sign string with signing key
-    signature = hmac.new(signing_key, string_to_sign.encode(
-        'utf-8'), hashlib.sha256).hexdigest()
+    signature = hmac.digest(signing_key, string_to_sign.encode('utf-8'),
+                            'sha256').hex()
 
     # build authorisaton header
     authorization_header = \
-        algorithm + ' ' + 'Credential=' + \
-        access_key + '/' + \
-        credential_scope + ', ' + 'SignedHeaders=' + \
-        signed_headers + ', ' + 'Signature=' + signature
+        f"{algorithm} Credential={access_key}/{credential_scope}, " + \
+        f"SignedHeaders={signed_headers}, Signature={signature}"
 
     # build standard headers
     headers = {'Host': host,
@@ -139,7 +145,7 @@ if __name__ == "__main__":
     # send request and print response
     print('Request URL = ' + request_url)
     print(headers)
-    r = requests.get(request_url, headers=headers)
+    r = SESSION.get(request_url, headers=headers)
 
     print('\nResponse')
     print(f"Response code: {r.status_code}\n")
@@ -147,6 +153,6 @@ if __name__ == "__main__":
 
     # parse and print XML response
     print("\n")
-    tree = ET.fromstring(r.text)
+    tree = ET.fromstring(r.content)
     print_xml_tree(tree)
     print("\n")
@@ -38,7 +38,7 @@ if __name__ == "__main__":
 
     # parse and print XML response
     print("\n")
-    print(s3.xml_to_text(r.text))
+    print(s3.xml_to_text(r.content))
     print("\n")
 
     # retrieve versioning configuration
@@ -58,5 +58,5 @@ if __name__ == "__main__":
 
     # parse and print XML response
     print("\n")
-    print(s3.xml_to_text(r.text))
+    print(s3.xml_to_text(r.content))
     print("\n")
@@ -43,13 +43,27 @@ import s3v4_rest as s3
 import requests
 import json
 import os
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2
 import time
 
+_MAX_PENDING_UPLOADS = 4  # frames captured ahead of the upload in progress
+# frame buffers reused by VideoCapture.read, one more than the pending
+# uploads so that a buffer is never overwritten while being sent
+_FRAME_BUFFERS = _MAX_PENDING_UPLOADS + 1
+
+
+def check_response(r: requests.Response):
+    # HTTP response status code 200 --> no error
+    if r.status_code != 200:
+        print("Error: ")
+
+
 if __name__ == "__main__":
     with open("./credentials.json", "r") as f:
-        credentials = json.loads(f.read())
+        credentials = json.load(f)
 
     bucket_name = "opencv"
     key_name = "output1.avi"
@@ -57,27 +71,45 @@ if __name__ == "__main__":
     N = 100  # number of frames to store
     start = time.perf_counter()
     cap = cv2.VideoCapture(0)
-    # append data, assuming bucket and appendable object are already created
-    while(cap.isOpened() and N > 0):
-        ret, frame = cap.read()
-        frame_bytes = frame.tobytes()
-        frame_size = len(frame_bytes)
-        request_url, headers = s3.build_request_url(
-            config=credentials,
-            req_method="PUT",
-            parameters={'append': '', 'position': str(pos)},
-            payload_hash=None,
-            payload_length=frame_size,
-            uri_path=f"/{bucket_name}/{key_name}",
-        )
-    r = requests.put(request_url, data=frame_bytes, headers=headers)
-
-    # HTTP response status code 200 --> no error
-    if r.status_code != 200:
-        print("Error: ")
+    # frames are appended through the same connection
+    session = s3.s3_session()
+    # append data, assuming bucket and appendable object are already created;
+    # appends must reach the server in order, a single thread uploads the
+    # frames while the next ones are captured
+    uri_path = f"/{bucket_name}/{key_name}"
+    # allocated by the first reads, then filled in place
+    buffers = [None] * _FRAME_BUFFERS
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        pending = collections.deque()
+        while(cap.isOpened() and N > 0):
+            ret, frame = cap.read(buffers[N % _FRAME_BUFFERS])
+            # frames returned by VideoCapture are contiguous, copy only if not
+            if not frame.flags['C_CONTIGUOUS']:
+                frame = np.ascontiguousarray(frame)
+            buffers[N % _FRAME_BUFFERS] = frame
+            # flat byte view of the frame buffer, sent without copying it
+            frame_bytes = memoryview(frame).cast('B')
+            frame_size = frame.nbytes
+            request_url, headers = s3.build_request_url(
+                config=credentials,
+                req_method="PUT",
+                # canonical query string, keys in sorted order, only the
+                # position changes between requests
+                parameters=f"append=&position={pos}",
+                payload_hash=None,
+                payload_length=frame_size,
+                uri_path=uri_path,
+            )
+            pending.append(uploader.submit(session.put, request_url,
+                                           data=frame_bytes, headers=headers))
+            # wait for the oldest upload when too many frames are queued
+            if len(pending) >= _MAX_PENDING_UPLOADS:
+                check_response(pending.popleft().result())
 
-    pos += frame_size  # increase pointer to next position
-    N -= 1
+            pos += frame_size  # increase pointer to next position
+            N -= 1
+        for f in pending:
+            check_response(f.result())
     end = time.perf_counter()
     print("Elapsed time (s): " + str(end - start))
     print("Frame size (bytes): " + str(frame_size))
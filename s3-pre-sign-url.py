@@ -19,9 +19,9 @@ import hashlib
 import hmac
 import argparse
 import datetime
+from functools import lru_cache
 from requests.utils import quote
 from urllib.parse import urlparse
-from urllib.parse import urlencode
 
 
 def str_to_seconds(days=0, hours=0, minutes=0, seconds=0):
@@ -33,9 +33,10 @@ def parse_time(t: str):
 
 
 def hash(key, msg):
-    return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+    return hmac.digest(key, msg.encode('utf-8'), 'sha256')
 
 
+@lru_cache(maxsize=8)
 def create_signature_key(key, date_stamp, region, service):
     date_key = hash(('AWS4' + key).encode('utf-8'), date_stamp)
     region_key = hash(date_key, region)
@@ -44,16 +45,23 @@ def create_signature_key(key, date_stamp, region, service):
     return signing_key
 
 
+@lru_cache(maxsize=8)
+def signing_hmac(signing_key):
+    # keyed HMAC state, copied for each string to sign
+    return hmac.new(signing_key, None, hashlib.sha256)
+
+
 def pre_sign_url(method, region, bucket_name, key_name,
                  endpoint, expiration, params):
 
     # canonical request
-    time = datetime.datetime.utcnow()
-    time_stamp = time.strftime('%Y%m%dT%H%M%SZ')
-    date_stamp = time.strftime('%Y%m%d')
+    time = datetime.datetime.now(datetime.timezone.utc)
+    time_stamp = f"{time.year:04d}{time.month:02d}{time.day:02d}T" + \
+                 f"{time.hour:02d}{time.minute:02d}{time.second:02d}Z"
+    date_stamp = time_stamp[:8]
 
-    credentials = access_key + '/' + date_stamp + '/' + region + \
-        '/s3/aws4_request'
+    credential_ctx = f"{date_stamp}/{region}/s3/aws4_request"
+    credentials = f"{access_key}/{credential_ctx}"
 
     parameters = {'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
                   'X-Amz-Credential': credentials,
@@ -63,7 +71,11 @@ def pre_sign_url(method, region, bucket_name, key_name,
     if params:
         parameters.update(params)
 
-    canonical_query_string_url_encoded = urlencode(parameters)
+    # SigV4 canonical query: sorted by key, RFC 3986 unreserved characters
+    # only left unescaped, spaces as '%20'
+    canonical_query_string_url_encoded = "&".join(
+        f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+        for k, v in sorted(parameters.items()))
 
     canonical_resource = '/'
     if bucket_name:
@@ -72,31 +84,34 @@ def pre_sign_url(method, region, bucket_name, key_name,
             canonical_resource += '/' + key_name
     # canonical_resource_url_encoded = quote(canonical_resource)
 
-    payload_hash = 'UNSIGNED-PAYLOAD'
-    canonical_headers = 'host:' + host
-    signed_headers = 'host'
-
-    canonical_request = (method + '\n' +
-                         canonical_resource + '\n' +
-                         canonical_query_string_url_encoded + '\n' +
-                         canonical_headers + '\n' +
-                         '\n' +
-                         signed_headers + '\n' +
-                         payload_hash).encode('utf-8')
+    # canonical request and text to sign are only hashed, built as bytes,
+    # only the variable parts are encoded
+    payload_hash = b'UNSIGNED-PAYLOAD'
+    canonical_headers = b'host:' + host.encode('utf-8')
+    signed_headers = b'host'
+
+    canonical_request = b"\n".join([
+        method.encode('utf-8'),
+        canonical_resource.encode('utf-8'),
+        canonical_query_string_url_encoded.encode('utf-8'),
+        canonical_headers,
+        b'',
+        signed_headers,
+        payload_hash])
 
     # text to sign
-    hashing_algorithm = 'AWS4-HMAC-SHA256'
-    credential_ctx = date_stamp + '/' + region + '/' + 's3' + '/' + \
-        'aws4_request'
-    string_to_sign = (hashing_algorithm + '\n' +
-                      time_stamp + '\n' +
-                      credential_ctx + '\n' +
-                      hashlib.sha256(canonical_request).hexdigest())
+    hashing_algorithm = b'AWS4-HMAC-SHA256'
+    string_to_sign = b"\n".join([
+        hashing_algorithm,
+        time_stamp.encode('utf-8'),
+        credential_ctx.encode('utf-8'),
+        hashlib.sha256(canonical_request).hexdigest().encode('utf-8')])
 
     # generate the signature
     signature_key = create_signature_key(secret_key, date_stamp, region, 's3')
-    signature = hmac.new(signature_key, string_to_sign.encode('utf-8'),
-                         hashlib.sha256).hexdigest()
+    mac = signing_hmac(signature_key).copy()
+    mac.update(string_to_sign)
+    signature = mac.hexdigest()
 
     request_url = (endpoint +
                    (('/' + bucket_name) if bucket_name else "") +
@@ -151,7 +166,7 @@ if __name__ == "__main__":
     endpoint = args.endpoint
     expiration = str_to_seconds(*parse_time(args.expiration))
     up = urlparse(args.endpoint)
-    host = up.hostname + f":{up.port}" if up.port else ""
+    host = f"{up.hostname}:{up.port}" if up.port else up.hostname
     params = None
     if args.params:
         params = dict(x.split('=') for x in args.params.split(';'))
@@ -63,12 +63,24 @@
 import s3v4_rest as s3
 import requests
 import sys
+import re
 import argparse
 import time
-import json
 import logging
-import xml.dom.minidom  # better than ET for pretty printing
-import xml.etree.ElementTree as ET
+try:
+    from lxml import etree  # faster parsing and pretty printing
+except ImportError:
+    etree = None
+
+
+def pretty_xml(content: bytes) -> str:
+    """Return indented XML text, lxml is used when available"""
+    if etree:
+        return etree.tostring(etree.fromstring(content),
+                              pretty_print=True).decode('utf-8')
+    import xml.dom.minidom  # imported only when needed, slow to load
+    return xml.dom.minidom.parseString(content).toprettyxml(indent="   ")
+
 
 
 if __name__ == "__main__":
@@ -162,16 +174,17 @@ if __name__ == "__main__":
     if args.payload and args.payload_is_file and args.subst_params:
         with open(args.payload) as f:
             payload = f.read()
-            payload = payload.replace("\n", "")
             subst_dict = dict([x.split("=")
                                for x in args.subst_params.split(";")])
-            for (k, v) in subst_dict.items():
-                payload = payload.replace(k, v)
+            # all keys replaced in a single pass, longest keys first so that
+            # keys which are prefixes of other keys do not shadow them
+            pattern = re.compile("|".join(
+                map(re.escape, sorted(subst_dict, key=len, reverse=True))))
+            payload = pattern.sub(lambda m: subst_dict[m.group(0)],
+                                  payload.replace("\n", ""))
         payload_is_file = False
 
-    config = None
-    with open(args.config_file, 'r') as j:
-        config = json.loads(j.read())
+    config = s3.load_config(args.config_file)
 
     if args.override_config:
         oc = dict([x.split("=", 2) for x in args.override_config.split(";")])
@@ -190,10 +203,7 @@ if __name__ == "__main__":
         content_file=args.content_file,
         proxy_endpoint=args.proxy)
 
-    content_type = None
-    for k in response.headers.keys():
-        if k.lower() == "content-type":
-            content_type = response.headers[k]
+    content_type = response.headers.get("content-type")
 
     if args.log_level.upper() == "RAW":
         print("STATUS CODE: " + str(response.status_code) + "\n")
@@ -208,10 +218,7 @@ if __name__ == "__main__":
                 elif ("text/html" in content_type or
                         "application/xml" in content_type or
                         "text/xml" in content_type):
-                    dom = xml.dom.minidom.parseString(
-                        response.content.decode('utf-8'))
-                    pretty = dom.toprettyxml(indent="   ")
-                    msg += pretty
+                    msg += pretty_xml(response.content)
             else:
                 msg += response.content[:1024].decode('utf-8')
             print(msg)
@@ -219,17 +226,21 @@ if __name__ == "__main__":
     if args.xml_query and response.text and \
             (content_type in ("application/xml", "text/xml")):
         ns = {"aws": "http://s3.amazonaws.com/doc/2006-03-01/"}
-        root = ET.fromstring(response.content)
-        n = root.findall(args.xml_query, ns)
+        if etree:
+            # compiled XPath, full XPath 1.0 expressions are supported
+            xpath = etree.XPath(args.xml_query, namespaces=ns)
+            n = xpath(etree.fromstring(response.content))
+        else:
+            import xml.etree.ElementTree as ET
+            n = ET.fromstring(response.content).findall(args.xml_query, ns)
         for i in n:
-            print(i.text)
+            # XPath expressions like 'text()' return strings, not elements
+            print(getattr(i, 'text', i))
 
     if args.header_keys and response.headers:
-        keys = args.header_keys.split(",") if "," in args.header_keys \
-            else args.header_keys
-        if keys and type(keys) == str and keys in response.headers.keys():
-            print(f"{keys}: {response.headers[keys]}")
-        else:
-            for k in keys:
-                if k in response.headers.keys():
-                    print(f"{k}: {response.headers[k]}")
+        # duplicates removed preserving order; lookups in the
+        # case-insensitive header dictionary are O(1)
+        keys = dict.fromkeys(k.strip() for k in args.header_keys.split(","))
+        for k in keys:
+            if k in response.headers:
+                print(f"{k}: {response.headers[k]}")
@@ -19,17 +19,29 @@
 
 """
 
-from urllib.parse import urlencode
+from urllib.parse import urlencode, quote
+import io
+import os
+import shutil
 import hashlib
-import datetime
 import hmac
-import xml.etree.ElementTree as ET
+try:
+    from lxml import etree as ET  # faster parsing, lower memory usage
+except ImportError:
+    import xml.etree.ElementTree as ET
+    # serialize S3 elements without the 'ns0:' prefix, lxml keeps the
+    # prefixes found in the parsed document
+    ET.register_namespace('', "http://s3.amazonaws.com/doc/2006-03-01/")
 import json
 import requests
+from requests.adapters import HTTPAdapter
+import functools
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import time
-import xml.dom.minidom  # better than ET for pretty printing
-from typing import Dict, Tuple, List, Union, ByteString, Callable
+from typing import Dict, Tuple, List, Union, ByteString, Callable, Iterator
 
 ###############################################################################
 # Private interface
@@ -44,11 +56,16 @@ def _sign(key, msg):
         key (str): key
         msg (str): test to sign
     """
-    return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+    # one-shot OpenSSL HMAC, no HMAC object created
+    return hmac.digest(key, msg.encode('utf-8'), 'sha256')
 
 
+@functools.lru_cache(maxsize=8)
 def _get_signature(key, date_stamp, region_name):
-    """Create signature
+    """Create signature, cached: the signing key only depends on the
+       arguments and is reused by all requests signed in the same day;
+       up to 8 derived keys, together with the secret keys used as cache
+       keys, are kept in memory for the lifetime of the process
 
     Args:
         key (str): starting key
@@ -65,6 +82,93 @@ def _get_signature(key, date_stamp, region_name):
     return signing_key
 
 
+@functools.lru_cache(maxsize=8)
+def _signing_context(access_key, secret_key, date_stamp, region_name):
+    """Request independent signing information, identical for all the
+       requests signed with the same keys in the same day
+
+    Args:
+        access_key (str): access key
+        secret_key (str): secret key
+        date_stamp (str): date
+        region_name (str): AWS region e.g. 'us-east-1'
+    Returns:
+        Tuple[str, hmac.HMAC, str]: credential scope, HMAC initialised with
+                                    the signing key, to be copied
+                                    before use, and 'Credential='
+                                    authorization header field
+    """
+    credential_scope = f"{date_stamp}/{region_name}/s3/aws4_request"
+    signing_key = _get_signature(secret_key, date_stamp, region_name)
+    return (credential_scope,
+            hmac.new(signing_key, None, 'sha256'),
+            f"Credential={access_key}/{credential_scope}")
+
+
+def _sign_chunk(signing_hmac, amzdate, credential_scope, previous_signature,
+                data):
+    """Sign payload chunk as required by STREAMING-AWS4-HMAC-SHA256-PAYLOAD,
+       each signature depends on the signature of the previous chunk, the
+       first one on the signature in the Authorization header
+
+    Returns:
+        Tuple[str, bytes]: chunk signature and aws-chunked encoded chunk
+    """
+    string_to_sign = "\n".join(["AWS4-HMAC-SHA256-PAYLOAD",
+                                amzdate,
+                                credential_scope,
+                                previous_signature,
+                                EMPTY_SHA256,
+                                hashlib.sha256(data).hexdigest()])
+    mac = signing_hmac.copy()
+    mac.update(string_to_sign.encode('utf-8'))
+    signature = mac.hexdigest()
+    return signature, b"".join([b"%x;chunk-signature=%s\r\n" %
+                                (len(data), signature.encode('ascii')),
+                                data, b"\r\n"])
+
+
+def _aws_chunked_length(size, chunk_size):
+    """Size of aws-chunked encoded payload, including the final empty chunk
+    """
+    def encoded(n):
+        return len(f"{n:x};chunk-signature=") + 64 + 2 + n + 2
+    full, last = divmod(size, chunk_size)
+    return full * encoded(chunk_size) + \
+        (encoded(last) if last else 0) + encoded(0)
+
+
+class _AwsChunkedBody:
+    """Iterable aws-chunked request body, file content is read, signed and
+       sent one chunk at a time; the length is known in advance so that
+       requests sends a Content-Length header instead of using chunked
+       transfer encoding
+    """
+    def __init__(self, f, size, signing_hmac, amzdate, credential_scope,
+                 seed_signature, chunk_size):
+        self.f = f
+        self.size = size
+        self.signing_hmac = signing_hmac
+        self.amzdate = amzdate
+        self.credential_scope = credential_scope
+        self.seed_signature = seed_signature
+        self.chunk_size = chunk_size
+
+    def __len__(self):
+        return _aws_chunked_length(self.size, self.chunk_size)
+
+    def __iter__(self):
+        signature = self.seed_signature
+        while True:
+            data = self.f.read(self.chunk_size)
+            signature, chunk = _sign_chunk(self.signing_hmac, self.amzdate,
+                                           self.credential_scope, signature,
+                                           data)
+            yield chunk
+            if not data:
+                break
+
+
 def _clean_xml_tag(tag):
     """ElementTree prefixes tags with a namespace if present
        use this function to remove prefix.
@@ -74,54 +178,160 @@ def _clean_xml_tag(tag):
     Returns:
         XML tag without {..} prefix
     """
-    closing_brace_index = tag.find('}')
-    return tag if closing_brace_index < 0 else tag[closing_brace_index+1:]
+    _, sep, tail = tag.partition('}')
+    return tail if sep else tag
+
+
+def _parse_xml(text: Union[str, ByteString]):
+    """Parse XML document, lxml does not accept str documents starting with
+       an encoding declaration, as returned by S3, bytes are always passed
+    """
+    return ET.fromstring(text.encode("utf-8") if isinstance(text, str)
+                         else text)
 
 
 def _xml_to_text(node: ET,
                  indentation_level: int = 0,
                  filter: Callable = lambda t: True):
-    """Recursively print xml tree
-
-    note: Python as a limit on the recursion level it can handle,
-          this is just implemented like this without returning functions
-          or using stacks to keep the code simple
+    """Print xml tree, depth-first traversal using an explicit stack,
+       not limited by the Python recursion limit
 
     Args:
         node (ElementTree.Element): a node in the XML tree
         indentaion_level (int): indendation level == nesting level in tree
         filter (function): ignore nodes for which function returns False
     Returns:
-        None
+        str: indented text, one line per node
     """
     BLANKS = 2
-    indent = indentation_level * BLANKS
-    text = ""
-    if filter(node.tag):
-        text += " "*indent + f"{_clean_xml_tag(node.tag)}: {node.text}\n"
-    for child in node:
-        text += _xml_to_text(child, indentation_level + 1)
-    return text
+    lines = []
+    stack = [(node, indentation_level)]
+    while stack:
+        node, level = stack.pop()
+        if filter(node.tag):
+            lines.append(" "*(level * BLANKS) +
+                         f"{_clean_xml_tag(node.tag)}: {node.text}\n")
+        # lxml comments have non-string tags, dropped by ElementTree
+        stack.extend((c, level + 1) for c in reversed(node)
+                     if isinstance(c.tag, str))
+    return "".join(lines)
+
+
+def _pretty_xml(text: Union[str, ByteString]) -> str:
+    """Indented XML text, indentation added in place to the parsed tree by
+       'indent', available in both ElementTree (Python >= 3.9) and lxml
+    """
+    root = _parse_xml(text)
+    ET.indent(root, space="   ")
+    return ET.tostring(root, encoding="unicode")
 
 
 _XML_NAMESPACE_PREFIX = "{http://s3.amazonaws.com/doc/2006-03-01/}"
 
+# SigV4 allows a 15 minutes difference between request date and server time
+_SIGNED_HEADERS_MAX_AGE = 300  # seconds
+_SIGNED_HEADERS_CACHE_SIZE = 64
+_signed_headers_cache: "collections.OrderedDict" = collections.OrderedDict()
+_signed_headers_lock = threading.Lock()
+
+_REGION = 'us-east-1'  # works with Ceph, any region might work actually
+_STREAMING_CHUNK_SIZE = 1 << 16  # aws-chunked payload chunk size
+
+_POOL_CONNECTIONS = 10
+_POOL_MAXSIZE = 100
+_MAX_RETRIES = 3
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_config(path: str, mtime: float) -> Dict:
+    # modification time is part of the cache key so that edited files are
+    # parsed again
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _load_config(path: str) -> Dict:
+    """Configuration files are read and parsed once per path and
+       modification time, the returned dictionary is shared among callers
+       and must not be modified
+    """
+    return _parse_config(path, os.path.getmtime(path))
+
+
+@functools.lru_cache(maxsize=128)
+def _encode_params(items: Tuple[Tuple[str, str], ...]) -> str:
+    """Canonical query string: parameters sorted by name and percent-encoded
+       as required by SigV4, spaces as '%20' not '+'
+    """
+    return urlencode(sorted(items), quote_via=quote, safe='-_.~')
+
+
+@functools.lru_cache(maxsize=1)
+def _default_session():
+    """Session used by 'send_s3_request' when none is passed, created
+       the first time a request is sent
+    """
+    return s3_session()
+
 ###############################################################################
 # Public interface
 
 UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"  # identify payloads with no hash
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()  # hash of empty payload
+# payload signed chunk by chunk while sending
+STREAMING_PAYLOAD = "STREAMING-AWS4-HMAC-SHA256-PAYLOAD"
+
+
+def load_config(path: str) -> Dict:
+    """Load json configuration file, parsed only when the file changed
+       since the last call
+
+    Args:
+        path (str): path to json configuration file
+    Returns:
+        Dict: copy of the configuration, can be modified by the caller
+    """
+    return dict(_load_config(path))
 
 
 def encode_url(params: Dict):
-    """Forward to urlencode, since we are alrady importing urlib.parse here
-       do not require client code to re-import it.
+    """Encode parameters as a SigV4 canonical query string: sorted by name
+       and percent-encoded with spaces as '%20' instead of '+'.
+
+    Encoded strings are cached and reused for identical parameters when all
+    values are strings, other values are encoded by urlencode each time.
 
     Args:
         params (Dict): dictionary containing list of key, value pairs
     Returns:
         str: URL-encoded text
     """
-    return urlencode(params)
+    if all(isinstance(v, str) for v in params.values()):
+        return _encode_params(tuple(params.items()))
+    return urlencode(sorted(params.items()), quote_via=quote, safe='-_.~')
+
+
+def s3_session(pool_maxsize: int = _POOL_MAXSIZE) -> requests.Session:
+    """Return session reusing keep-alive connections across requests
+
+    Requests sent through the same session to the same endpoint reuse
+    pooled connections instead of performing a new TCP/TLS handshake at
+    each request.
+
+    Args:
+        pool_maxsize (int): max number of pooled connections per host, set
+                            to the number of threads when sending requests
+                            concurrently
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=_POOL_CONNECTIONS,
+                          pool_maxsize=pool_maxsize,
+                          max_retries=_MAX_RETRIES)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 
 def build_multipart_list(parts: List[Tuple[int, str]]) -> str:
@@ -132,18 +342,14 @@ def build_multipart_list(parts: List[Tuple[int, str]]) -> str:
     Returns:
         XML part list
     """
-    begin = '<CompleteMultipartUpload>'
-    body = ""
-    for (partnum, etag) in parts:
-        body += f"<Part><ETag>{etag}</ETag>"
-        body += f"<PartNumber>{partnum}</PartNumber></Part>"
+    return "".join(["<CompleteMultipartUpload>",
+                    *[f"<Part><ETag>{etag}</ETag>"
+                      f"<PartNumber>{partnum}</PartNumber></Part>"
+                      for (partnum, etag) in parts],
+                    "</CompleteMultipartUpload>"])
 
-    end = "</CompleteMultipartUpload>"
 
-    return begin + body + end
-
-
-def get_upload_id(xml_response: str):
+def get_upload_id(xml_response: Union[str, ByteString]):
     """Extract UploadId value from xml response
 
     This function in mainly meant to be used when performing explicit
@@ -151,12 +357,14 @@ def get_upload_id(xml_response: str):
     the first POST request to initiate the multipart upload.
 
     Args:
-        xml_response (str): UploadId tag returned by S3 server
+        xml_response (str or ByteString): UploadId tag returned by S3
+                                          server, pass response content as
+                                          bytes to avoid decoding
     Returns:
         str: request id
 
     """
-    tree = ET.fromstring(xml_response)
+    tree = _parse_xml(xml_response)
     return tree.find(f"{_XML_NAMESPACE_PREFIX}UploadId").text
 
 
@@ -176,20 +384,52 @@ def get_tag_id(response_header: Dict[str, str]):
     return response_header['ETag']
 
 
-def xml_to_text(text: str):
+def xml_to_text(text: Union[str, ByteString]):
     """Print XML tree to text
 
     Args:
-        text (str): textual representation of XML tree
+        text (str or ByteString): textual representation of XML tree, pass
+                                  response content as bytes to avoid
+                                  decoding
     Returns:
         str: indented textual representation of XML tag hierarchy
     """
     if not text:
         return ""
-    tree = ET.fromstring(text)
+    tree = _parse_xml(text)
     return _xml_to_text(tree)
 
 
+def iter_objects(xml_response: Union[str, ByteString]) \
+        -> Iterator[Tuple[str, str]]:
+    """Iterate over objects in ListObjects response
+
+    The response is parsed incrementally and each <Contents> element is
+    discarded after being processed, no tree is built for the whole response.
+
+    Args:
+        xml_response (str or ByteString): XML response returned by S3 server
+    Returns:
+        Iterator[Tuple[str, str]]: (key, size) tuples
+
+    """
+    if not xml_response:
+        return
+    if isinstance(xml_response, str):
+        xml_response = xml_response.encode('utf-8')
+    contents = f"{_XML_NAMESPACE_PREFIX}Contents"
+    for _, elem in ET.iterparse(io.BytesIO(xml_response), events=('end',)):
+        if elem.tag != contents:
+            continue
+        yield (elem.findtext(f"{_XML_NAMESPACE_PREFIX}Key"),
+               elem.findtext(f"{_XML_NAMESPACE_PREFIX}Size"))
+        elem.clear()
+        # lxml only: also remove processed elements from parent
+        if hasattr(elem, 'getprevious'):
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+
 def hash(data):
     """SHA 256 hash of text or binary data
 
@@ -198,10 +438,114 @@ def hash(data):
     Returns:
         str: textual hexadecimal representation of SHA 256-encoded data
     """
-    if type(data) == str:
-        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+    return hashlib.sha256(data.encode('utf-8') if isinstance(data, str)
+                          else data).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def _amz_date(seconds: int) -> str:
+    """UTC timestamp in ISO 8601 basic format, formatted once per second
+       and shared by all the requests signed in the same second
+    """
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(seconds))
+
+
+def _sign_headers(method, canonical_uri, canonical_querystring, host_header,
+                  payload_hash, x_amz_headers, access_key, secret_key,
+                  region):
+    """Compute SigV4 signature of request with current date
+
+    Returns:
+        Tuple[Dict[str, str], str, str]: Host, X-Amz-* headers,
+                                         Authorization header value and
+                                         canonical headers
+    """
+    # dates for headers credential string
+    amzdate = _amz_date(int(time.time()))
+    # Date w/o time, used in credential scope
+    datestamp = amzdate[:8]
+
+    default_headers = {'Host': host_header,
+                       'X-Amz-Content-SHA256': payload_hash,
+                       'X-Amz-Date': amzdate}
+
+    if not x_amz_headers:
+        # common case: only the default headers, already in canonical order
+        canonical_headers = f"host:{host_header}\n" + \
+                            f"x-amz-content-sha256:{payload_hash}\n" + \
+                            f"x-amz-date:{amzdate}\n"
+        signed_headers = 'host;x-amz-content-sha256;x-amz-date'
     else:
-        return hashlib.sha256(data).hexdigest()
+        # keys are already unique since all (key, value) pairs are stored in
+        # dictionary with unique keys, this means the case of multiple
+        # headers with the same key is not supported; headers are sorted by
+        # lowercase name, as in the signed headers list
+        all_headers = {k.lower().strip(): v.strip()
+                       for k, v in default_headers.items()}
+        all_headers.update({k.lower().strip(): v.strip()
+                            for k, v in x_amz_headers.items()})
+        signed_headers_list = sorted(all_headers.keys())
+        canonical_headers = "".join(
+            [f"{k}:{all_headers[k]}\n" for k in signed_headers_list])
+        # build signed header string
+        signed_headers = ";".join(signed_headers_list)
+
+    # canonical request, built with a single join and encoded once, it is
+    # only hashed
+    canonical_request = "\n".join([method,
+                                   canonical_uri,
+                                   canonical_querystring,
+                                   canonical_headers,
+                                   signed_headers,
+                                   payload_hash]).encode('utf-8')
+
+    algorithm = 'AWS4-HMAC-SHA256'
+    # credential scope and signing key are only computed once per day
+    credential_scope, signing_hmac, credential = \
+        _signing_context(access_key, secret_key, datestamp, region)
+
+    # string to sign
+    string_to_sign = "\n".join([algorithm,
+                                amzdate,
+                                credential_scope,
+                                hashlib.sha256(canonical_request).hexdigest()])
+
+    # sign string with signing key, copying the keyed HMAC state instead
+    # of padding and hashing the key again
+    mac = signing_hmac.copy()
+    mac.update(string_to_sign.encode('utf-8'))
+    signature = mac.hexdigest()
+
+    # build authorisaton header
+    authorization_header = \
+        f"{algorithm} {credential}, SignedHeaders={signed_headers}, " + \
+        f"Signature={signature}"
+
+    return default_headers, authorization_header, canonical_headers
+
+
+def _get_signed_headers(key):
+    """Return copy of headers and authorization of request signed less than
+       _SIGNED_HEADERS_MAX_AGE seconds ago, None if not found
+    """
+    with _signed_headers_lock:
+        signed = _signed_headers_cache.get(key)
+        if not signed:
+            return None
+        if time.monotonic() - signed[0] > _SIGNED_HEADERS_MAX_AGE:
+            del _signed_headers_cache[key]
+            return None
+        _signed_headers_cache.move_to_end(key)
+        return dict(signed[1]), signed[2]
+
+
+def _put_signed_headers(key, default_headers, authorization_header):
+    with _signed_headers_lock:
+        _signed_headers_cache[key] = (time.monotonic(),
+                                      dict(default_headers),
+                                      authorization_header)
+        if len(_signed_headers_cache) > _SIGNED_HEADERS_CACHE_SIZE:
+            _signed_headers_cache.popitem(last=False)
 
 
 # Type declarations
@@ -220,7 +564,8 @@ def build_request_url(config: Union[S3Config, str] = None,
                       payload_length: int = 0,
                       uri_path: str = '/',
                       additional_headers: Dict[str, str] = None,
-                      proxy_endpoint: str = None) -> Request:
+                      proxy_endpoint: str = None,
+                      reuse_signed_headers: bool = False) -> Request:
     """Build S3 REST request and headers
 
     S3Config type: Dict[str, str] with keys:
@@ -236,7 +581,10 @@ def build_request_url(config: Union[S3Config, str] = None,
                                        to json configuration file
         req_method (str): request method e.g. 'GET'
         parameters (RequestParameters): dictionary containing URI request
-                                        parameters
+                                        parameters, or already encoded
+                                        canonical query string, sorted by
+                                        key, e.g. built from a template
+                                        when only a value changes
         payload_hash (str): sha256-hash of payload, use 'UNSIGNED_PAYLOAD'
                             for non hashed payload
         payload_length (int): length of payload, in case of 'None' no
@@ -247,6 +595,9 @@ def build_request_url(config: Union[S3Config, str] = None,
                                             are added to the singed list
         proxy_endpoint (str): in cases where the request is sent to a proxy
                               do use this endpoint to compose the url
+        reuse_signed_headers (bool): if True identical requests signed less
+                                     than _SIGNED_HEADERS_MAX_AGE seconds
+                                     ago reuse the same date and signature
     Returns:
         Tuple[URL, Headers]
 
@@ -265,11 +616,10 @@ def build_request_url(config: Union[S3Config, str] = None,
     start = time.perf_counter()
     # TODO: raise excpetion if any key in 'additional_headers' matches keys
     # in headers dictionary ??
-    if type(config) == dict:
+    if isinstance(config, dict):
         conf = config
     else:  # interpret as file path
-        with open(config, "r") as f:
-            conf = json.loads(f.read())
+        conf = _load_config(config)
 
     req_method = req_method.upper()
     # no explicit rasing of exceptions because the run-time will already
@@ -278,96 +628,51 @@ def build_request_url(config: Union[S3Config, str] = None,
 
     payload_hash = payload_hash or UNSIGNED_PAYLOAD  # in case its None
     protocol = conf['protocol']
-    port = conf['port'] if 'port' in conf.keys() else None
+    port = conf.get('port')
     host = conf['host']
     access_key = conf['access_key']
     secret_key = conf['secret_key']
 
-    service = 's3'
     method = req_method
-    region = 'us-east-1'  # works with Ceph, any region might work actually
-    endpoint = protocol + '://' + host + (f":{port}" if port else '')
+    region = _REGION
+    host_header = host + (f":{port}" if port else '')
+    endpoint = protocol + '://' + host_header
 
-    request_parameters = urlencode(parameters) if parameters else ''
+    if isinstance(parameters, str):  # already encoded
+        request_parameters = parameters
+    else:
+        request_parameters = encode_url(parameters) if parameters else ''
 
     # canonical URI
-    canonical_uri = uri_path
+    # each path segment percent-encoded once, as sent on the wire
+    canonical_uri = quote(uri_path, safe='/~')
     canonical_querystring = request_parameters
 
-    # dates for headers credential string
-    dt = datetime.datetime.utcnow()
-    amzdate = dt.strftime('%Y%m%dT%H%M%SZ')
-    # Date w/o time, used in credential scope
-    datestamp = dt.strftime('%Y%m%d')
-
-    default_headers = {'Host': host + (f":{port}" if port else ''),
-                       'X-Amz-Content-SHA256': payload_hash,
-                       'X-Amz-Date': amzdate}
-
     x_amz_headers = {}
     if additional_headers:
         x_amz_headers = {k.strip(): additional_headers[k]
                          for k in additional_headers.keys()
-                         if k.lower().strip()[:len('x-amz')] == 'x-amz'}
-
-    all_headers = default_headers.copy()
-    all_headers.update(x_amz_headers)
-    canonical_headers = "\n".join(
-        [f"{k.lower().strip()}:{all_headers[k].strip()}"
-         for k in sorted(all_headers.keys())]) + "\n"
-
-    # add all x-amz-* headers, sort and add to signed headers list
-    signed_headers_list = ['host', 'x-amz-content-sha256', 'x-amz-date']
-    if x_amz_headers:
-        signed_headers_list.extend([x.lower().strip()
-                                    for x in x_amz_headers.keys()])
-
-    # keys are already unique since all (key, value) pairs are stored in
-    # dictionary with unique keys, this means the case of multiple headers
-    # with the same key is not supported
-    signed_headers_list.sort()
-
-    # build signed header string
-    signed_headers = ";".join(signed_headers_list)
-
-    # canonical request
-    canonical_request = \
-        method + "\n" +  \
-        canonical_uri + '\n' +  \
-        canonical_querystring + '\n' + \
-        canonical_headers + '\n' +  \
-        signed_headers + '\n' +  \
-        payload_hash
-
-    algorithm = 'AWS4-HMAC-SHA256'
-    credential_scope = \
-        datestamp + \
-        '/' + \
-        region + \
-        '/' + \
-        service + \
-        '/' + \
-        'aws4_request'
-
-    # string to sign
-    string_to_sign = \
-        algorithm + '\n' + \
-        amzdate + '\n' + \
-        credential_scope + '\n' + \
-        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
-
-    signing_key = _get_signature(secret_key, datestamp, region)
-
-    # sign string with signing key
-    signature = hmac.new(signing_key, string_to_sign.encode(
-        'utf-8'), hashlib.sha256).hexdigest()
-
-    # build authorisaton header
-    authorization_header = \
-        algorithm + ' ' + 'Credential=' + \
-        access_key + '/' + \
-        credential_scope + ', ' + 'SignedHeaders=' + \
-        signed_headers + ', ' + 'Signature=' + signature
+                         if k.strip().lower().startswith('x-amz')}
+
+    # opt-in: a reused date shortens the clock skew margin and widens
+    # the replay window of the request
+    canonical_headers = None
+    signed = None
+    if reuse_signed_headers:
+        cache_key = (method, canonical_uri, canonical_querystring,
+                     payload_hash, host_header, access_key, secret_key,
+                     tuple(x_amz_headers.items()))
+        signed = _get_signed_headers(cache_key)
+    if signed:
+        default_headers, authorization_header = signed
+    else:
+        default_headers, authorization_header, canonical_headers = \
+            _sign_headers(method, canonical_uri, canonical_querystring,
+                          host_header, payload_hash, x_amz_headers,
+                          access_key, secret_key, region)
+        if reuse_signed_headers:
+            _put_signed_headers(cache_key, default_headers,
+                                authorization_header)
 
     # build standard headers
     headers = default_headers
@@ -397,7 +702,8 @@ def build_request_url(config: Union[S3Config, str] = None,
                "Canonical URI: " + canonical_uri + n + \
                "Canonical querystring: " + canonical_querystring + n + \
                "Canonical headers: " + n
-        chl = canonical_headers.split("\n")
+        chl = canonical_headers.split("\n") if canonical_headers \
+            else ["(signed headers reused)"]
         for h in chl:
             msg += "\t" + h + n
         msg += "Payload hash: " + (payload_hash or "")
@@ -412,16 +718,7 @@ def build_request_url(config: Union[S3Config, str] = None,
     return request_url, headers
 
 
-_REQUESTS_METHODS = {"get": requests.get,
-                     "put": requests.put,
-                     "post": requests.post,
-                     "delete": requests.delete,
-                     "head": requests.head}
-
-
-def _find_key(d: Dict, key: str):
-    k = [x for x in d.keys() if x.lower() == key.lower()]
-    return k[0] if len(k) else None
+_REQUESTS_METHODS = frozenset(("GET", "PUT", "POST", "DELETE", "HEAD"))
 
 
 def send_s3_request(config: Union[S3Config, str] = None,
@@ -435,7 +732,8 @@ def send_s3_request(config: Union[S3Config, str] = None,
                     additional_headers: Dict[str, str] = None,
                     content_file: str = None,
                     proxy_endpoint: str = None,
-                    chunk_size: int = 1 << 20) \
+                    chunk_size: int = 1 << 20,
+                    session: requests.Session = None) \
         -> requests.Request:
     """Send REST request with headers signed according to S3v4 specification
 
@@ -460,8 +758,9 @@ def send_s3_request(config: Union[S3Config, str] = None,
                                      returned by 'open' will be passed to the
                                      'data' paramter of the
                                      requests.* functions
-        sign_payload (bool): sign payload, not currently supported when
-                             filepath specified
+        sign_payload (bool): sign payload, file content is signed in
+                             64 KiB chunks while uploading
+                             (STREAMING-AWS4-HMAC-SHA256-PAYLOAD)
         bucket_name (str): name of bucket appended to URI: /bucket_name
         key_name (str): name of key appended to URI :/bucket_name/key_name
         action (str): name of actional appended to URI:
@@ -469,9 +768,14 @@ def send_s3_request(config: Union[S3Config, str] = None,
         additiona_headers (Dic[str,str]): additional custom headers, the
                                           ones starting with 'x-amz-'
                                           are added to the singed list
-        content_file (str): file to store received content
+        content_file (str): file to store received content, the content is
+                            streamed to file and not available in the
+                            returned response
         proxy_endpoint: endpoint to which requests will be sent for further
                         forwarding to actual endpoint
+        session (requests.Session): session used to send the request, a
+                                    module-wide session created with
+                                    's3_session' is used if None
     Returns:
         requests.Response
 
@@ -488,16 +792,27 @@ def send_s3_request(config: Union[S3Config, str] = None,
 
     """
     start = time.perf_counter()
+    if not isinstance(config, dict):  # interpret as file path
+        config = _load_config(config)
     payload_hash = None
     if sign_payload:
         if payload_is_file_name:
-            raise NotImplementedError(
-                "Signing of file content not supported yet")
+            # file content is signed chunk by chunk while uploading, the
+            # file is never read in full to compute the payload hash
+            payload_size = os.path.getsize(payload)
+            payload_hash = STREAMING_PAYLOAD
+            additional_headers = dict(additional_headers or {})
+            additional_headers.update(
+                {'Content-Encoding': 'aws-chunked',
+                 'x-amz-decoded-content-length': str(payload_size)})
         else:
             payload = payload or ""
-            payload_hash = hash(payload)
+            payload_hash = hashlib.sha256(
+                payload.encode('utf-8') if isinstance(payload, str)
+                else payload).hexdigest() if payload else EMPTY_SHA256
 
-    if req_method.lower() not in _REQUESTS_METHODS.keys():
+    req_method = req_method.upper()  # normalized once
+    if req_method not in _REQUESTS_METHODS:
         raise ValueError(f"ERROR - invalid request method: {req_method}")
     content_length = len(payload) if payload else 0
 
@@ -511,6 +826,9 @@ def send_s3_request(config: Union[S3Config, str] = None,
 
     if payload and payload_is_file_name:
         content_length = 0  # will be created by requests when uploading file
+        if payload_hash == STREAMING_PAYLOAD:
+            content_length = _aws_chunked_length(payload_size,
+                                                 _STREAMING_CHUNK_SIZE)
 
     # in case of url parameters, method == POST and empty payload, parameters
     # are urlencoded and passed in body automatically by requests and therefore
@@ -532,54 +850,62 @@ def send_s3_request(config: Union[S3Config, str] = None,
         request_url = proxy_endpoint
     else:
         request_url = f"{config['protocol']}://{config['host']}"
-        if 'port' in config.keys():
-            request_url += ":" + str(config['port'])
-    request_url += "/"
-    if bucket_name:
-        request_url += bucket_name
-        if key_name:
-            request_url += "/" + key_name
+        # same as in 'build_request_url', empty or null port is not added
+        if config.get('port'):
+            request_url += f":{config['port']}"
+    # same encoding as the signed canonical URI
+    request_url += quote(uri_path, safe='/~')
 
+    session = session or _default_session()
     response = None
     if payload and payload_is_file_name:
-        response = _REQUESTS_METHODS[req_method.lower()](
-            request_url,
-            data=open(payload, 'rb'),
-            params=parameters,
-            headers=headers,
-            stream=True)
+        # file content is streamed from disk, Content-Length is computed by
+        # requests from the file size or the aws-chunked encoded size, no
+        # chunked transfer encoding
+        with open(payload, 'rb') as f:
+            data = f
+            if payload_hash == STREAMING_PAYLOAD:
+                amzdate = headers['X-Amz-Date']
+                credential_scope, signing_hmac, _ = _signing_context(
+                    config['access_key'], config['secret_key'],
+                    amzdate[:8], _REGION)
+                data = _AwsChunkedBody(
+                    f, payload_size, signing_hmac, amzdate,
+                    credential_scope,
+                    headers['Authorization'].rsplit('Signature=', 1)[1],
+                    _STREAMING_CHUNK_SIZE)
+            response = session.request(
+                req_method,
+                request_url,
+                data=data,
+                params=parameters,
+                headers=headers,
+                stream=True)
         if logging.getLogger().level == logging.DEBUG:
             logging.debug("Payload: file " + payload + '\n')
     else:
         data = payload
-        if parameters and not payload and req_method.lower() == 'post':
+        if parameters and not payload and req_method == 'POST':
             data = parameters
-        response = _REQUESTS_METHODS[req_method.lower()](url=request_url,
-                                                         data=data,
-                                                         params=parameters,
-                                                         headers=headers,
-                                                         stream=True)
+        response = session.request(req_method,
+                                   url=request_url,
+                                   data=data,
+                                   params=parameters,
+                                   headers=headers,
+                                   stream=True)
         if logging.getLogger().level == logging.DEBUG:
             logging.debug("Payload: \n" + (payload or "") + '\n')
 
     def ok(code):
         return 200 <= code < 300
 
-    def transfer_chunked(headers):
-        for k in headers.keys():
-            if k.lower() == "transfer-encoding":
-                return headers[k].lower() == "chunked"
-        return False
-
-    chunked = transfer_chunked(response.headers)
-
-    if content_file and ok(response.status_code) and response.content:
+    if content_file and ok(response.status_code):
+        # body copied from the socket to the file 'chunk_size' bytes at a
+        # time, never loaded into memory; response.content is empty
+        # afterwards
+        response.raw.decode_content = True
         with open(content_file, "wb") as of:
-            if chunked:
-                for i in response.iter_content(chunk_size=chunk_size):
-                    of.write(i)
-            else:
-                of.write(response.content)
+            shutil.copyfileobj(response.raw, of, chunk_size)
 
     logfun = logging.info if ok(response.status_code) else logging.error
 
@@ -596,36 +922,62 @@ def send_s3_request(config: Union[S3Config, str] = None,
             msg += f"{k}: {v}\n"
         logfun(msg)
 
-    def read_chunks():
-        nonlocal response
-        text = ""
-        if chunked:
-            for i in response.iter_content(chunk_size=chunk_size):
-                text += i.decode('utf-8')
-        else:
-            text = response.content.decode('utf-8')
-        return text
-
-    content_type = None
-    for k in response.headers.keys():
-        if k.lower() == "content-type":
-            content_type = response.headers[k]
+    content_type = response.headers.get("content-type")
 
-    if response.content and not content_file:
+    # the body is only read when it is going to be logged, otherwise it is
+    # left in the stream for the caller to consume
+    if not content_file and logging.getLogger().isEnabledFor(
+            logging.INFO if ok(response.status_code) else logging.ERROR) \
+            and response.content:
         msg = "RESPONSE CONTENT\n" + 20 * "=" + '\n'
-        if content_type:
-            if ("application/json" in content_type or
-                    "text/plain" in content_type):
-                msg += read_chunks()
-            elif ("text/html" in content_type or
-                    "application/xml" in content_type):
-                dom = xml.dom.minidom.parseString(read_chunks())
-                pretty = dom.toprettyxml(indent="   ")
-                msg += pretty
-            else:
-                msg += read_chunks()[:1024]
+        if content_type and ("application/json" in content_type or
+                             "text/plain" in content_type):
+            msg += response.content.decode('utf-8')
+        elif content_type and ("text/html" in content_type or
+                               "application/xml" in content_type):
+            msg += _pretty_xml(response.content)
         else:
-            msg += read_chunks()[:1024]
+            # possibly binary content, only the beginning is logged
+            msg += response.content[:1024].decode('utf-8', 'replace')
         logfun(msg)
 
     return response
+
+
+def send_s3_requests_parallel(config: Union[S3Config, str],
+                              requests_args: List[Dict],
+                              max_workers: int = 8) \
+        -> List[requests.Response]:
+    """Send independent requests concurrently e.g. multipart upload parts
+
+    Each request is sent by 'send_s3_request' from a thread pool, all
+    threads share one session with a connection pool as large as the number
+    of workers so that every thread keeps its own keep-alive connection.
+
+    Args:
+        config (Union[S3Config, str]): configuration passed to all requests
+        requests_args (List[Dict]): keyword arguments of 'send_s3_request'
+                                    for each request, excluding 'config'
+                                    and 'session'
+        max_workers (int): max number of requests sent at the same time
+    Returns:
+        List[requests.Response]: responses in the same order as
+                                 'requests_args'
+
+    Example:
+        parts = [{'req_method': 'PUT', 'bucket_name': 'b', 'key_name': 'k',
+                  'parameters': {'partNumber': str(i + 1),
+                                 'uploadId': upload_id},
+                  'payload': chunk}
+                 for (i, chunk) in enumerate(chunks)]
+        responses = send_s3_requests_parallel(config, parts)
+        etags = [get_tag_id(r.headers) for r in responses]
+    """
+    if not isinstance(config, dict):
+        config = _load_config(config)
+    session = s3_session(pool_maxsize=max_workers)
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            lambda args: send_s3_request(config=config, session=session,
+                                         **args),
+            requests_args))